@@ -0,0 +1,86 @@
+"""Пропускная способность POST /posts/ с POST_COALESCE_ENABLED и без.
+
+Режим переключается в процессе, поэтому запросы идут через
+ASGITransport. Выигрыш виден, когда в пуле меньше соединений, чем
+параллельных запросов.
+
+Запуск (нужна та же БД, что и для тестов):
+    DB_POOL_SIZE=5 DB_MAX_OVERFLOW=0 python -m benchmarks.coalescing --concurrency 64
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+from httpx import AsyncClient
+
+from benchmarks.common import ADMIN_PASS, login, make_client, percentile
+from src.core.coalescer import post_coalescer
+from src.core.config import settings
+
+
+async def create_posts(
+    client: AsyncClient, headers: dict[str, str], requests: int, concurrency: int
+) -> tuple[float, list[float], list[int]]:
+    """Создать requests постов в concurrency потоков."""
+    latencies: list[float] = []
+    post_ids: list[int] = []
+    counter = itertools.count()
+
+    async def worker() -> None:
+        while next(counter) < requests:
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/v1/posts/", json={"text": "coalescing benchmark"}, headers=headers
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.text
+            post_ids.append(response.json()["id"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, post_ids
+
+
+async def run(requests: int, concurrency: int) -> None:
+    async with make_client() as client:
+        headers = await login(client, "Aurora", ADMIN_PASS)
+        post_ids: list[int] = []
+        try:
+            for enabled in (False, True):
+                settings.POST_COALESCE_ENABLED = enabled
+                flushes, items = post_coalescer.flushes, post_coalescer.items
+                elapsed, latencies, created = await create_posts(
+                    client, headers, requests, concurrency
+                )
+                post_ids += created
+                name = "coalesced" if enabled else "per-request"
+                line = (
+                    f"{name:>12}: rps={len(latencies) / elapsed:9.1f} "
+                    f"p50={statistics.median(latencies):8.2f}ms "
+                    f"p99={percentile(latencies, 99):8.2f}ms"
+                )
+                if enabled:
+                    batches = post_coalescer.flushes - flushes
+                    line += f" avg batch={(post_coalescer.items - items) / batches:.1f}"
+                print(line)
+        finally:
+            for start in range(0, len(post_ids), 500):
+                await client.request(
+                    "DELETE",
+                    "/api/v1/posts/batch",
+                    json={"ids": post_ids[start : start + 500]},
+                    headers=headers,
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency))
@@ -0,0 +1,56 @@
+"""Общие помощники бенчмарков: клиент, логин и перцентили."""
+
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from httpx import ASGITransport, AsyncClient, Limits
+
+from src.core.config import settings
+
+ADMIN_PASS = settings.ADMIN_PASS
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Вернуть q-й перцентиль (0..100) списка значений."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def disable_rate_limits() -> None:
+    """Отключить ограничители login/register: бенчмарки логинятся часто."""
+    from src.api.deps import client_limiter, login_limiter
+
+    for limiter in (client_limiter, login_limiter):
+        limiter.rate = 0
+
+
+@asynccontextmanager
+async def make_client(base_url: str | None = None) -> AsyncGenerator[AsyncClient, None]:
+    """Клиент к приложению в процессе или к запущенному серверу по base_url.
+
+    Запущенному серверу ограничения частоты нужно отключить самому.
+    """
+    if base_url is None:
+        from src.main import app
+
+        disable_rate_limits()
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                yield client
+    else:
+        async with AsyncClient(
+            base_url=base_url, limits=Limits(max_connections=None), timeout=60
+        ) as client:
+            yield client
+
+
+async def login(client: AsyncClient, username: str, password: str) -> dict[str, str]:
+    """Залогиниться и вернуть заголовок авторизации."""
+    response = await client.post(
+        "/api/v1/users/login", data={"username": username, "password": password}
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
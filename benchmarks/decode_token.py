@@ -0,0 +1,39 @@
+"""Стоимость decode_token без кеша токенов и с ним.
+
+БД не нужна:
+    python -m benchmarks.decode_token --number 100000
+"""
+
+import argparse
+import timeit
+
+from src.api.deps import decode_token, token_cache
+from src.core.auth import create_tokens
+from src.models import Users
+
+
+def run(number: int) -> None:
+    user = Users(username="Aurora", password="", token_version=1)
+    token = create_tokens(user)["access_token"]
+
+    def uncached() -> None:
+        token_cache.clear()
+        decode_token(token)
+
+    def clear() -> None:
+        token_cache.clear()
+
+    baseline = timeit.timeit(clear, number=number)
+    cold = timeit.timeit(uncached, number=number) - baseline
+    decode_token(token)
+    warm = timeit.timeit(lambda: decode_token(token), number=number)
+    for name, total in (("verify", cold), ("cached", warm)):
+        print(f"{name:>8}: {total / number * 1e6:8.2f} us/call")
+    print(f" speedup: x{cold / warm:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.number)
@@ -0,0 +1,305 @@
+"""Нагрузочный бенчмарк горячих эндпоинтов API.
+
+Засевает N пользователей и M постов на каждого, затем гоняет каждый
+сценарий с заданной конкурентностью и печатает пропускную способность и
+p50/p95/p99. Результат можно сохранить как JSON базовую линию и сравнить
+с ней следующий прогон.
+
+Запуск (нужна та же БД, что и для тестов):
+    python -m benchmarks.load run --users 20 --posts 50 --save base.json
+    python -m benchmarks.load run --base-url http://localhost:8000 --save new.json
+    python -m benchmarks.load compare base.json new.json --threshold 10
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from httpx import AsyncClient, Response
+
+from benchmarks.common import ADMIN_PASS, login, make_client, percentile
+
+USER_PASS = "benchmark-pass"
+
+# Для каждой метрики: растет ли она при ухудшении.
+HIGHER_IS_WORSE = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "rps": False}
+
+
+@dataclass
+class BenchUser:
+    """Засеянный пользователь и его посты."""
+
+    username: str
+    headers: dict[str, str]
+    post_ids: list[int] = field(default_factory=list)
+
+
+@dataclass
+class Context:
+    """Данные, общие для всех сценариев прогона."""
+
+    admin: dict[str, str]
+    users: list[BenchUser]
+    rng: random.Random
+
+    def pick(self) -> BenchUser:
+        return self.rng.choice(self.users)
+
+
+Scenario = Callable[[AsyncClient, Context], Awaitable[Response]]
+
+
+async def scenario_login(client: AsyncClient, ctx: Context) -> Response:
+    return await client.post(
+        "/api/v1/users/login",
+        data={"username": ctx.pick().username, "password": USER_PASS},
+    )
+
+
+async def scenario_create_post(client: AsyncClient, ctx: Context) -> Response:
+    user = ctx.pick()
+    response = await client.post(
+        "/api/v1/posts/", json={"text": "benchmark post"}, headers=user.headers
+    )
+    if response.status_code == 200:
+        user.post_ids.append(response.json()["id"])
+    return response
+
+
+async def scenario_read_users_posts(client: AsyncClient, ctx: Context) -> Response:
+    return await client.get(
+        "/api/v1/posts/", params={"limit": 100}, headers=ctx.pick().headers
+    )
+
+
+async def scenario_read_selected_post(client: AsyncClient, ctx: Context) -> Response:
+    user = ctx.pick()
+    post_id = ctx.rng.choice(user.post_ids)
+    return await client.get(f"/api/v1/posts/{post_id}", headers=user.headers)
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "login": scenario_login,
+    "create_post": scenario_create_post,
+    "read_users_posts": scenario_read_users_posts,
+    "read_selected_post": scenario_read_selected_post,
+}
+
+
+async def seed(
+    client: AsyncClient, users: int, posts: int, rng: random.Random
+) -> Context:
+    """Создать пользователей с постами через API."""
+    admin = await login(client, "admin", ADMIN_PASS)
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    seeded = []
+    for index in range(users):
+        username = f"{prefix}-{index}"
+        response = await client.post(
+            "/api/v1/users/register",
+            json={
+                "username": username,
+                "password": USER_PASS,
+                "repeat_password": USER_PASS,
+            },
+        )
+        assert response.status_code == 200, response.text
+        user = BenchUser(username, await login(client, username, USER_PASS))
+        for start in range(0, posts, 500):
+            count = min(500, posts - start)
+            response = await client.post(
+                "/api/v1/posts/batch",
+                json=[{"text": f"seed post {start + i}"} for i in range(count)],
+                headers=user.headers,
+            )
+            assert response.status_code == 200, response.text
+            user.post_ids += [post["id"] for post in response.json()]
+        seeded.append(user)
+    return Context(admin, seeded, rng)
+
+
+async def cleanup(client: AsyncClient, ctx: Context) -> None:
+    """Удалить засеянные данные."""
+    for user in ctx.users:
+        for start in range(0, len(user.post_ids), 500):
+            await client.request(
+                "DELETE",
+                "/api/v1/posts/batch",
+                json={"ids": user.post_ids[start : start + 500]},
+                headers=user.headers,
+            )
+        await client.delete(f"/api/v1/admin/{user.username}", headers=ctx.admin)
+
+
+async def measure(
+    client: AsyncClient,
+    ctx: Context,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+) -> dict[str, Any]:
+    """Выполнить requests вызовов сценария в concurrency потоков."""
+    latencies: list[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker() -> None:
+        nonlocal errors
+        while next(counter) < requests:
+            start = time.perf_counter()
+            response = await scenario(client, ctx)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Засеять данные, прогнать сценарии и вернуть отчет."""
+    rng = random.Random(args.seed)
+    names = args.endpoints or list(SCENARIOS)
+    results: dict[str, Any] = {}
+    async with make_client(args.base_url) as client:
+        ctx = await seed(client, args.users, args.posts, rng)
+        try:
+            for name in names:
+                # Прогрев: соединения пула, кеши и план запроса.
+                await measure(client, ctx, SCENARIOS[name], args.warmup, 1)
+                results[name] = await measure(
+                    client, ctx, SCENARIOS[name], args.requests, args.concurrency
+                )
+                print_row(name, results[name])
+        finally:
+            await cleanup(client, ctx)
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "users",
+                "posts",
+                "requests",
+                "concurrency",
+                "seed",
+                "base_url",
+            )
+        },
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def print_row(name: str, result: dict[str, Any]) -> None:
+    print(
+        f"{name:>20}: n={result['requests']:6d} err={result['errors']:4d} "
+        f"rps={result['rps']:9.1f} p50={result['p50_ms']:8.2f}ms "
+        f"p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms"
+    )
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[str]:
+    """Вернуть строки с регрессиями больше threshold процентов."""
+    regressions = []
+    for name, base in baseline["results"].items():
+        result = current["results"].get(name)
+        if result is None:
+            continue
+        for metric, higher_is_worse in HIGHER_IS_WORSE.items():
+            if not base[metric]:
+                continue
+            change = (result[metric] - base[metric]) / base[metric] * 100
+            worse = change if higher_is_worse else -change
+            mark = "REGRESSION" if worse > threshold else ""
+            print(
+                f"{name:>20} {metric:>7}: {base[metric]:10.2f} -> "
+                f"{result[metric]:10.2f} ({change:+6.1f}%) {mark}"
+            )
+            if mark:
+                regressions.append(f"{name} {metric} {change:+.1f}%")
+    return regressions
+
+
+def positive_int(value: str) -> int:
+    """Тип аргумента: целое не меньше 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="прогнать бенчмарк")
+    # Сценарии берут случайного пользователя и его случайный пост.
+    run_parser.add_argument("--users", type=positive_int, default=10)
+    run_parser.add_argument("--posts", type=positive_int, default=100)
+    run_parser.add_argument("--requests", type=int, default=1000)
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--warmup", type=int, default=20)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument(
+        "--base-url", help="адрес запущенного сервера вместо ASGITransport"
+    )
+    run_parser.add_argument(
+        "--endpoints", nargs="+", choices=list(SCENARIOS), help="какие сценарии гонять"
+    )
+    run_parser.add_argument("--save", help="сохранить отчет в JSON файл")
+    run_parser.add_argument("--baseline", help="сравнить с сохраненным отчетом")
+    run_parser.add_argument("--threshold", type=float, default=10.0)
+
+    compare_parser = commands.add_parser("compare", help="сравнить два отчета")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10.0)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = asyncio.run(run(args))
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump(report, file, indent=2)
+        if not args.baseline:
+            return
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    else:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            report = json.load(file)
+
+    regressions = compare(baseline, report, args.threshold)
+    if regressions:
+        print("regressions above threshold:", ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Задержка GET /posts/ на фоне параллельных логинов.
+
+Запуск (нужна та же БД, что и для тестов):
+    python -m benchmarks.login_contention --duration 10 --logins 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.common import ADMIN_PASS, disable_rate_limits, percentile
+from src.main import app
+
+
+async def login_loop(client: AsyncClient, stop: asyncio.Event) -> int:
+    """Логиниться, пока не выставлен stop. Вернуть число логинов."""
+    count = 0
+    while not stop.is_set():
+        await client.post(
+            "/api/v1/users/login", data={"username": "Aurora", "password": ADMIN_PASS}
+        )
+        count += 1
+    return count
+
+
+async def measure_reads(
+    client: AsyncClient, headers: dict[str, str], duration: float
+) -> list[float]:
+    """Последовательно читать список постов и вернуть задержки в мс."""
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/api/v1/posts/", headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    return latencies
+
+
+async def run(duration: float, logins: int) -> None:
+    disable_rate_limits()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(
+            "/api/v1/users/login", data={"username": "admin", "password": ADMIN_PASS}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        idle = await measure_reads(client, headers, duration)
+
+        stop = asyncio.Event()
+        workers = [asyncio.create_task(login_loop(client, stop)) for _ in range(logins)]
+        loaded = await measure_reads(client, headers, duration)
+        stop.set()
+        login_count = sum(await asyncio.gather(*workers))
+
+    for name, values in (("idle", idle), (f"{logins} logins", loaded)):
+        print(
+            f"{name:>12}: n={len(values):6d} "
+            f"p50={statistics.median(values):8.2f}ms "
+            f"p99={percentile(values, 99):8.2f}ms"
+        )
+    print(f"logins completed: {login_count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--logins", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.duration, args.logins))
@@ -0,0 +1,95 @@
+"""Обычная сериализация списка постов против FAST_JSON.
+
+Создает пользователя с 1000 постов и сравнивает задержку GET /posts/ с
+limit 10, 100 и 1000 в обоих режимах. Режим переключается в процессе,
+поэтому запросы идут через ASGITransport.
+
+Запуск (нужна та же БД, что и для тестов):
+    python -m benchmarks.serialization --requests 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from httpx import AsyncClient
+
+from benchmarks.common import login, make_client, percentile
+from src.core.config import settings
+
+PAGE_SIZES = (10, 100, 1000)
+PASSWORD = "benchmark-pass"
+
+
+async def measure(
+    client: AsyncClient, headers: dict[str, str], limit: int, requests: int
+) -> list[float]:
+    """Последовательно читать страницу и вернуть задержки в мс."""
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(
+            "/api/v1/posts/", params={"limit": limit}, headers=headers
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    return latencies
+
+
+async def run(requests: int) -> None:
+    async with make_client() as client:
+        username = f"bench-{uuid.uuid4().hex[:8]}"
+        await client.post(
+            "/api/v1/users/register",
+            json={
+                "username": username,
+                "password": PASSWORD,
+                "repeat_password": PASSWORD,
+            },
+        )
+        headers = await login(client, username, PASSWORD)
+        admin = await login(client, "admin", settings.ADMIN_PASS)
+        post_ids = []
+        for start in range(0, max(PAGE_SIZES), 500):
+            response = await client.post(
+                "/api/v1/posts/batch",
+                json=[{"text": f"Benchmark post {start + i} " * 4} for i in range(500)],
+                headers=headers,
+            )
+            post_ids += [post["id"] for post in response.json()]
+        try:
+            for limit in PAGE_SIZES:
+                medians = {}
+                for fast in (False, True):
+                    settings.FAST_JSON = fast
+                    await measure(client, headers, limit, 10)
+                    values = await measure(client, headers, limit, requests)
+                    medians[fast] = statistics.median(values)
+                    name = "fast" if fast else "pydantic"
+                    print(
+                        f"limit={limit:5d} {name:>8}: "
+                        f"p50={medians[fast]:8.2f}ms p99={percentile(values, 99):8.2f}ms"
+                    )
+                print(
+                    f"limit={limit:5d} speedup: x{medians[False] / medians[True]:.2f}"
+                )
+        finally:
+            for start in range(0, len(post_ids), 500):
+                await client.request(
+                    "DELETE",
+                    "/api/v1/posts/batch",
+                    json={"ids": post_ids[start : start + 500]},
+                    headers=headers,
+                )
+            await client.delete(f"/api/v1/admin/{username}", headers=admin)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
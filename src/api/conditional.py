@@ -0,0 +1,51 @@
+import hashlib
+
+from fastapi import Request, Response
+
+from src.core.metrics import record_conditional
+
+
+def post_etag(post_id: int, version: int) -> str:
+    """Сильный ETag поста: меняется при каждом изменении поста."""
+    return f'"{post_id}-{version}"'
+
+
+def list_etag(author_id: int, count: int, revision: int, query: str) -> str:
+    """Слабый ETag списка постов автора.
+
+    Строится по счетчикам из user_post_stats, поэтому проверка стоит
+    одного чтения по первичному ключу независимо от числа постов.
+    Параметры запроса входят в ETag, так как от них зависит страница.
+    """
+    digest = hashlib.blake2b(
+        f"{author_id}:{count}:{revision}:{query}".encode(), digest_size=16
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Сравнить ETag с заголовком If-None-Match (слабое сравнение)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == bare
+        for candidate in if_none_match.split(",")
+    )
+
+
+def check_etag(
+    request: Request, response: Response, etag: str, endpoint: str
+) -> Response | None:
+    """Вернуть ответ 304, если у клиента актуальная версия.
+
+    Иначе проставить ETag в ответ и вернуть None.
+    """
+    matched = etag_matches(request.headers.get("if-none-match"), etag)
+    record_conditional(endpoint, matched)
+    if matched:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
@@ -1,39 +1,109 @@
+import math
 from collections.abc import AsyncGenerator
-from typing import Annotated
+from dataclasses import dataclass
+from typing import Annotated, NoReturn, TypeVar
 
-from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
+from sqlalchemy import ColumnElement, Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select
+from sqlmodel import col, or_, select
 
+from src.core.auth import REFRESH_TOKEN_TYPE
+from src.core.cache import PrincipalCache, TTLCache
 from src.core.config import settings
-from src.core.database import async_session
+from src.core.database import async_session, replica_router
+from src.core.ratelimit import RateLimiter
 from src.models import Posts, Users
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
+        session.info["sticky_key"] = request.headers.get("Authorization")
         yield session
 
 
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для обработчиков, которые только читают.
+
+    Идет в реплику, если они настроены, иначе в основную БД.
+    """
+    session = await replica_router.open(request.headers.get("Authorization"))
+    async with session:
+        yield session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/users/login")
 oauth2_scheme_errors_off = OAuth2PasswordBearer(
     tokenUrl="/api/v1/users/login", auto_error=False
 )
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL
+)
+# Уже проверенные токены: (токен, refresh) -> (username, token_version).
+# Запись живет до exp токена, ttl не используется.
+token_cache: TTLCache[tuple[str, bool], tuple[str, int]] = TTLCache(
+    settings.TOKEN_CACHE_SIZE, ttl=0
+)
+
+
+# Ограничители дорогих из-за bcrypt login и register.
+login_limiter = RateLimiter(
+    settings.LOGIN_RATE_PER_MINUTE, settings.LOGIN_RATE_BURST, settings.RATE_LIMIT_KEYS
+)
+client_limiter = RateLimiter(
+    settings.CLIENT_RATE_PER_MINUTE,
+    settings.CLIENT_RATE_BURST,
+    settings.RATE_LIMIT_KEYS,
+)
+
+
+def check_rate(limiter: RateLimiter, key: str) -> None:
+    """Ответить 429 с Retry-After, если корзина ключа пуста."""
+    wait = limiter.acquire(key)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+async def limit_client(request: Request) -> None:
+    """Ограничить частоту запросов с одного адреса."""
+    check_rate(client_limiter, request.client.host if request.client else "")
 
 
-def decode_token(token: str) -> tuple[str, int]:
-    """Декодировать токен."""
+async def limit_login(credentials: OAuth2PasswordRequestForm = Depends()) -> None:
+    """Ограничить частоту попыток входа под одним username."""
+    check_rate(login_limiter, credentials.username)
+
+
+def decode_token(token: str, refresh: bool = False) -> tuple[str, int]:
+    """Декодировать токен.
+
+    Refresh токен принимается только при refresh=True и наоборот.
+    Успешно проверенные токены кешируются до их exp, невалидные каждый
+    раз проверяются заново.
+    """
+    cached = token_cache.get((token, refresh))
+    if cached is not None:
+        return cached
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
         token_version = payload.get("ver")
 
+        if payload.get("typ") != (REFRESH_TOKEN_TYPE if refresh else None):
+            raise HTTPException(status_code=401, detail="Invalid token")
         if not isinstance(username, str):
             raise HTTPException(status_code=401, detail="Invalid token")
         if not isinstance(token_version, int):
@@ -42,9 +112,34 @@ def decode_token(token: str) -> tuple[str, int]:
     except (JWTError, TypeError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)):
+        token_cache.set((token, refresh), (username, token_version), expires_at)
     return username, token_version
 
 
+async def get_principal(
+    session: AsyncSession, username: str, token_version: int
+) -> Users | None:
+    """Получить пользователя из кеша, а при промахе из БД."""
+    user = principal_cache.get_user(username, token_version)
+    if user is None:
+        result = await session.execute(select(Users).where(Users.username == username))
+        user = result.scalar_one_or_none()
+        if user is not None:
+            principal_cache.set_user(token_version, user)
+    return user
+
+
+def check_user(user: Users | None, token_version: int) -> Users:
+    """Проверить, что пользователь существует и токен актуален."""
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    if user.token_version != token_version or not user.is_active:
+        raise HTTPException(status_code=403, detail="User is not authorized")
+    return user
+
+
 async def is_authorized(
     session: SessionDep, token: str | None = Depends(oauth2_scheme_errors_off)
 ) -> bool:
@@ -52,8 +147,7 @@ async def is_authorized(
     if token is None:
         return False
     username, token_version = decode_token(token)
-    result = await session.execute(select(Users).where(Users.username == username))
-    user = result.scalar_one_or_none()
+    user = await get_principal(session, username, token_version)
     if user is None or token_version != user.token_version or not user.is_active:
         return False
     return True
@@ -65,13 +159,8 @@ AuthorizedDep = Annotated[Users, Depends(is_authorized)]
 async def is_user(session: SessionDep, token: str = Depends(oauth2_scheme)) -> Users:
     """Определить авторизован ли пользователь и вернуть его объект из БД."""
     username, token_version = decode_token(token)
-    result = await session.execute(select(Users).where(Users.username == username))
-    user = result.scalar_one_or_none()
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    if user.token_version != token_version or not user.is_active:
-        raise HTTPException(status_code=403, detail="User is not authorized")
-    return user
+    user = await get_principal(session, username, token_version)
+    return check_user(user, token_version)
 
 
 IsUserDep = Annotated[Users, Depends(is_user)]
@@ -86,12 +175,52 @@ async def is_admin(user: IsUserDep) -> Users:
     return user
 
 
-async def get_post(session: SessionDep, post_id: int, user: IsUserDep) -> Posts:
-    """Определить является ли пользователь автором поста.
-    Вернуть пост.
+@dataclass
+class PostRef:
+    """Пост, к которому обращается пользователь из токена."""
+
+    post_id: int
+    username: str
+    token_version: int
+
+    def owned(self) -> list[ColumnElement[bool]]:
+        """Условия WHERE для UPDATE/DELETE поста одним запросом.
+
+        Совпадают только если токен актуален, а пользователь автор поста
+        или администратор.
+        """
+        return [
+            Posts.id == self.post_id,
+            Users.username == self.username,
+            Users.token_version == self.token_version,
+            col(Users.is_active),
+            or_(Posts.author_id == Users.id, col(Users.superuser)),
+        ]
+
+
+async def load_post(session: AsyncSession, ref: PostRef) -> Posts:
+    """Загрузить пользователя и пост одним запросом и проверить доступ.
+
+    Сессия должна быть основной БД: на реплике отозванный токен может
+    еще считаться действующим.
     """
-    result = await session.execute(select(Posts).where(Posts.id == post_id))
-    post = result.scalar_one_or_none()
+    result = await session.execute(
+        select(Users, Posts)
+        .outerjoin(Posts, Posts.id == ref.post_id)
+        .where(Users.username == ref.username)
+    )
+    row = result.one_or_none()
+    user = check_user(row[0] if row else None, ref.token_version)
+    principal_cache.set_user(ref.token_version, user)
+    return check_access(user, row[1] if row else None)
+
+
+# Пост целиком или строка только с его id, author_id и version.
+PostT = TypeVar("PostT", Posts, Row[tuple[int, int, int]])
+
+
+def check_access(user: Users, post: PostT | None) -> PostT:
+    """Проверить, что пост существует и принадлежит пользователю или он админ."""
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
     if post.author_id != user.id and not user.superuser:
@@ -99,4 +228,52 @@ async def get_post(session: SessionDep, post_id: int, user: IsUserDep) -> Posts:
     return post
 
 
-PostDep = Annotated[Posts, Depends(get_post)]
+async def raise_post_error(session: AsyncSession, ref: PostRef) -> NoReturn:
+    """Выбросить ту же ошибку, что вернул бы load_post.
+
+    Вызывается, когда условный UPDATE/DELETE не затронул ни одной строки.
+    """
+    await load_post(session, ref)
+    raise HTTPException(status_code=404, detail="Post not found")
+
+
+async def get_post_ref(post_id: int, token: str = Depends(oauth2_scheme)) -> PostRef:
+    """Разобрать токен без обращения к БД."""
+    username, token_version = decode_token(token)
+    return PostRef(post_id, username, token_version)
+
+
+PostRefDep = Annotated[PostRef, Depends(get_post_ref)]
+
+
+async def check_ref(session: AsyncSession, ref: PostRef) -> Users:
+    """Проверить токен из ref по кешу или основной БД."""
+    user = await get_principal(session, ref.username, ref.token_version)
+    return check_user(user, ref.token_version)
+
+
+async def get_post(
+    session: SessionDep, read_session: ReadSessionDep, ref: PostRefDep
+) -> Posts:
+    """Определить является ли пользователь автором поста.
+    Вернуть пост.
+
+    Токен проверяется по кешу или основной БД, как в is_user, а из
+    реплики читается только сам пост.
+    """
+    if not read_session.info.get("replica"):
+        return await load_post(read_session, ref)
+    user = await check_ref(session, ref)
+    post = await read_session.scalar(select(Posts).where(Posts.id == ref.post_id))
+    return check_access(user, post)
+
+
+async def get_post_version(
+    session: SessionDep, read_session: ReadSessionDep, ref: PostRefDep
+) -> int:
+    """Проверить доступ к посту и вернуть его версию, не читая текст."""
+    user = await check_ref(session, ref)
+    result = await read_session.execute(
+        select(Posts.id, Posts.author_id, Posts.version).where(Posts.id == ref.post_id)
+    )
+    return check_access(user, result.one_or_none()).version
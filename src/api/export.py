@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Any, Literal
+
+from sqlalchemy import Row, Select
+
+from src.core.config import settings
+from src.core.database import replica_router
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def plain(value: Any) -> Any:
+    """Привести значение к виду, одинаковому для JSON и CSV."""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_ndjson(rows: Sequence[Row[Any]]) -> str:
+    """Закодировать пачку строк в NDJSON."""
+    return "".join(
+        json.dumps(
+            {key: plain(value) for key, value in row._mapping.items()},
+            ensure_ascii=False,
+        )
+        + "\n"
+        for row in rows
+    )
+
+
+def encode_csv(rows: Sequence[Row[Any]]) -> str:
+    """Закодировать пачку строк в CSV без заголовка."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def csv_header(columns: Sequence[str]) -> str:
+    """Строка заголовка CSV."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue()
+
+
+async def stream_rows(
+    stmt: Select[Any], export_format: ExportFormat
+) -> AsyncIterator[str]:
+    """Отдавать результат запроса пачками через серверный курсор.
+
+    В памяти одновременно держится не больше EXPORT_CHUNK_SIZE строк,
+    поэтому потребление памяти не зависит от размера таблицы. Сессия
+    открывается здесь, а не через SessionDep, потому что генератор
+    работает уже после выхода из обработчика.
+    """
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+    async with await replica_router.open() as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+        )
+        # Заголовок CSV пишется и для пустой выгрузки.
+        if export_format == "csv":
+            yield csv_header(list(result.keys()))
+        async for rows in result.partitions():
+            yield encode(rows)
@@ -0,0 +1,43 @@
+from typing import Any
+
+import orjson
+from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel, select
+
+from src.api.pagination import SortOrder, page_query, set_next_cursor
+from src.models import Posts
+
+
+def post_columns(model: type[SQLModel]) -> list[Any]:
+    """Колонки Posts в порядке полей схемы ответа."""
+    return [getattr(Posts, name) for name in model.model_fields]
+
+
+async def fetch_posts_json(
+    session: AsyncSession,
+    model: type[SQLModel],
+    response: Response,
+    cursor: str | None,
+    limit: int,
+    skip: int = 0,
+    *criteria: Any,
+    order: SortOrder = "asc",
+) -> Response:
+    """То же, что fetch_posts_page, но сразу готовый JSON.
+
+    Выбираются только поля схемы model, строки кодируются orjson без
+    создания ORM объектов и повторной валидации Pydantic. Формат ответа
+    совпадает с обычным: те же ключи в том же порядке, время в ISO 8601
+    с Z для UTC.
+    """
+    stmt = select(*post_columns(model)).where(*criteria)
+    result = await session.execute(
+        page_query(stmt, response, cursor, limit, skip, order)
+    )
+    rows = result.all()
+    set_next_cursor(response, rows, limit)
+    body = orjson.dumps([row._asdict() for row in rows], option=orjson.OPT_UTC_Z)
+    # Заголовки, выставленные через параметр response (ETag, курсор),
+    # FastAPI не переносит в возвращенный напрямую Response.
+    return Response(body, media_type="application/json", headers=response.headers)
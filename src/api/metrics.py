@@ -0,0 +1,179 @@
+import time
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.api.deps import client_limiter, login_limiter, principal_cache, token_cache
+from src.core import metrics
+from src.core.database import pool_status
+
+# Метка для путей, не совпавших ни с одним маршрутом, чтобы случайные
+# URL не раздували число временных рядов.
+UNMATCHED_ROUTE = "<unmatched>"
+
+router = APIRouter(tags=["metrics"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware: число и длительность запросов по шаблону маршрута.
+
+    Заодно собирает число и время запросов к БД внутри HTTP запроса.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db = metrics.RequestDbStats()
+        token = metrics.current_db_stats.set(db)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.current_db_stats.reset(token)
+            # Роутер FastAPI кладет найденный маршрут в тот же scope.
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            metrics.record_request(scope["method"], route, status, elapsed, db)
+
+
+def escape(value: str) -> str:
+    """Экранировать значение метки."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def labels(**values: Any) -> str:
+    """Отформатировать набор меток."""
+    if not values:
+        return ""
+    return "{" + ",".join(f'{k}="{escape(str(v))}"' for k, v in values.items()) + "}"
+
+
+def metric_header(name: str, kind: str, help_text: str) -> list[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def histogram_lines(
+    name: str,
+    histograms: Mapping[tuple[str, ...], metrics.Histogram],
+    keys: Iterable[str],
+) -> list[str]:
+    """Строки гистограмм в формате Prometheus."""
+    lines = []
+    key_names = tuple(keys)
+    for key, histogram in histograms.items():
+        base = dict(zip(key_names, key))
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{labels(**base, le=bound)} {count}")
+        lines.append(f"{name}_sum{labels(**base)} {histogram.sum}")
+        lines.append(f"{name}_count{labels(**base)} {histogram.count}")
+    return lines
+
+
+def render_metrics() -> str:
+    """Собрать все метрики воркера в текстовом формате Prometheus."""
+    lines = metric_header("http_requests_total", "counter", "HTTP requests.")
+    for (method, route, status), count in metrics.http_requests.items():
+        lines.append(
+            f"http_requests_total{labels(method=method, route=route, status=status)}"
+            f" {count}"
+        )
+    for name, kind, help_text, histograms in (
+        (
+            "http_request_duration_seconds",
+            "histogram",
+            "HTTP request latency.",
+            metrics.http_latency,
+        ),
+        (
+            "http_request_db_queries",
+            "histogram",
+            "Database queries per HTTP request.",
+            metrics.http_db_queries,
+        ),
+        (
+            "http_request_db_seconds",
+            "histogram",
+            "Database time per HTTP request.",
+            metrics.http_db_time,
+        ),
+    ):
+        lines += metric_header(name, kind, help_text)
+        lines += histogram_lines(name, histograms, ("method", "route"))
+
+    lines += metric_header(
+        "db_query_duration_seconds", "histogram", "Database query latency."
+    )
+    lines += histogram_lines(
+        "db_query_duration_seconds", {(): metrics.db_query_latency}, ()
+    )
+
+    pool = pool_status()
+    for key in ("size", "checked_out", "checked_in", "overflow"):
+        lines += metric_header(f"db_pool_{key}", "gauge", f"Pool {key}.")
+        lines.append(f"db_pool_{key} {pool[key]}")
+    for key in ("checkouts", "connects", "timeouts"):
+        lines += metric_header(f"db_pool_{key}_total", "counter", f"Pool {key}.")
+        lines.append(f"db_pool_{key}_total {pool[key]}")
+    lines += metric_header(
+        "db_pool_wait_seconds", "histogram", "Time waiting for a pool connection."
+    )
+    lines += histogram_lines(
+        "db_pool_wait_seconds", {(): metrics.pool_metrics.wait}, ()
+    )
+
+    lines += metric_header(
+        "http_conditional_requests_total", "counter", "Requests to ETag endpoints."
+    )
+    lines += metric_header(
+        "http_not_modified_total", "counter", "304 Not Modified responses."
+    )
+    for endpoint, (total, not_modified) in metrics.conditional_requests.items():
+        lines.append(
+            f"http_conditional_requests_total{labels(endpoint=endpoint)} {total}"
+        )
+        lines.append(
+            f"http_not_modified_total{labels(endpoint=endpoint)} {not_modified}"
+        )
+
+    for prefix, cache in (("principal", principal_cache), ("token", token_cache)):
+        stats = cache.stats()
+        lines += metric_header(
+            f"{prefix}_cache_size", "gauge", f"Entries in the {prefix} cache."
+        )
+        lines.append(f"{prefix}_cache_size {stats['size']}")
+        for key in ("hits", "misses"):
+            lines += metric_header(
+                f"{prefix}_cache_{key}_total", "counter", f"{prefix} cache {key}."
+            )
+            lines.append(f"{prefix}_cache_{key}_total {stats[key]}")
+
+    lines += metric_header(
+        "rate_limited_total", "counter", "Requests rejected by rate limits."
+    )
+    for name, limiter in (("login", login_limiter), ("client", client_limiter)):
+        lines.append(f"rate_limited_total{labels(limiter=name)} {limiter.rejected}")
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,122 @@
+import base64
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated, Any, Literal
+
+from fastapi import Depends, HTTPException, Response
+from sqlalchemy import ColumnElement, Select, not_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import col
+
+from src.models import Posts
+
+SortOrder = Literal["asc", "desc"]
+
+
+def encode_cursor(*values: Any) -> str:
+    """Упаковать значения ключа сортировки в непрозрачный курсор."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """Распаковать курсор, проверив число значений."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+@dataclass
+class PostFilters:
+    """Фильтры и порядок списка постов из параметров запроса."""
+
+    completed: bool | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    order: SortOrder = "asc"
+
+    def criteria(self) -> list[ColumnElement[bool]]:
+        """Условия WHERE для заданных фильтров.
+
+        completed=false обслуживает частичный индекс ix_posts_author_open.
+        """
+        criteria = []
+        if self.completed is not None:
+            completed = col(Posts.completed)
+            criteria.append(completed if self.completed else not_(completed))
+        if self.created_after is not None:
+            criteria.append(Posts.created_at > self.created_after)
+        if self.created_before is not None:
+            criteria.append(Posts.created_at < self.created_before)
+        return criteria
+
+
+PostFiltersDep = Annotated[PostFilters, Depends()]
+
+
+def page_query(
+    stmt: Select[Any],
+    response: Response,
+    cursor: str | None,
+    limit: int,
+    skip: int = 0,
+    order: SortOrder = "asc",
+) -> Select[Any]:
+    """Добавить к запросу постов условие курсора или OFFSET, порядок и LIMIT."""
+    key = tuple_(Posts.created_at, Posts.id)
+    if cursor is not None:
+        created_at, post_id = decode_cursor(cursor, 2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not isinstance(post_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        last = tuple_(created_at, post_id)
+        stmt = stmt.where(key > last if order == "asc" else key < last)
+    elif skip:
+        stmt = stmt.offset(skip)
+        response.headers["Deprecation"] = "true"
+    if order == "desc":
+        return stmt.order_by(Posts.created_at.desc(), Posts.id.desc()).limit(limit)
+    return stmt.order_by(Posts.created_at, Posts.id).limit(limit)
+
+
+def set_next_cursor(response: Response, posts: Sequence[Any], limit: int) -> None:
+    """Вернуть курсор следующей страницы, если текущая заполнена."""
+    if len(posts) == limit:
+        last = posts[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            last.created_at.isoformat(), last.id
+        )
+
+
+async def fetch_posts_page(
+    session: AsyncSession,
+    stmt: Select[tuple[Posts]],
+    response: Response,
+    cursor: str | None,
+    limit: int,
+    skip: int = 0,
+    order: SortOrder = "asc",
+) -> Sequence[Posts]:
+    """Получить страницу постов, упорядоченных по (created_at, id).
+
+    Следующая страница ищется по индексу от последнего ключа, поэтому
+    стоит одинаково на любой глубине. Курсор следующей страницы
+    возвращается в заголовке X-Next-Cursor. skip оставлен для старых
+    клиентов и работает через OFFSET.
+    """
+    result = await session.execute(
+        page_query(stmt, response, cursor, limit, skip, order)
+    )
+    posts = result.scalars().all()
+    set_next_cursor(response, posts, limit)
+    return posts
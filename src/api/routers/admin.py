@@ -1,13 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select
+from typing import Any
 
-from src.api.deps import SessionDep, is_admin
-from src.core.security import hash_password
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import delete, insert, select, update
+
+from src.api.deps import (
+    ReadSessionDep,
+    SessionDep,
+    is_admin,
+    principal_cache,
+    token_cache,
+)
+from src.api.export import MEDIA_TYPES, ExportFormat, stream_rows
+from src.api.fastjson import fetch_posts_json
+from src.api.pagination import PostFiltersDep, fetch_posts_page
+from src.api.search import search_posts
+from src.api.stats import get_post_stats
+from src.api.user_import import import_users
+from src.core.config import settings
+from src.core.database import pool_status
+from src.core.metrics import conditional_stats
+from src.core.purge import user_purger
+from src.core.security import hash_password_async
 from src.models import (
     AdminUserInfoResponse,
     PostResponseAdmin,
+    PostStats,
     Posts,
     UserCreate,
+    UserImportResult,
+    UserPostStats,
     UserResponse,
     UserRoleUpdate,
     Users,
@@ -25,35 +48,126 @@ async def create_user(session: SessionDep, user: UserCreate):
         raise HTTPException(status_code=403, detail="Username already taken")
     if user.password != user.repeat_password:
         raise HTTPException(status_code=409, detail="Passwords don't match")
-    hashed = hash_password(user.password)
-    new_user = Users(username=user.username, password=hashed)
-    session.add(new_user)
-    await session.commit()
-    await session.refresh(new_user)
+    hashed = await hash_password_async(user.password)
+    try:
+        new_user = await session.scalar(
+            insert(Users)
+            .values(username=user.username, password=hashed)
+            .returning(Users)
+        )
+        await session.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=403, detail="Username already taken")
     return new_user
 
 
+@router.post(
+    "/users/import",
+    dependencies=[Depends(is_admin)],
+    response_model=list[UserImportResult],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"text/csv": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def import_users_csv(session: SessionDep, request: Request):
+    """Массовое создание пользователей из CSV (username,password).
+
+    Тело читается потоком, в ответе результат по каждой строке.
+    """
+    return await import_users(session, request.stream())
+
+
 @router.get(
     "/posts", dependencies=[Depends(is_admin)], response_model=list[PostResponseAdmin]
 )
-async def read_all_posts(session: SessionDep, skip: int = 0, limit: int = 10):
+async def read_all_posts(
+    session: ReadSessionDep,
+    response: Response,
+    filters: PostFiltersDep,
+    cursor: str | None = None,
+    limit: int = Query(default=10, ge=1, le=1000),
+    skip: int = Query(default=0, ge=0, deprecated=True),
+):
     """Просмотр всех постов всех пользователей."""
-    result = await session.execute(select(Posts).offset(skip).limit(limit))
-    posts = result.scalars().all()
-    return posts
+    if settings.FAST_JSON:
+        return await fetch_posts_json(
+            session,
+            PostResponseAdmin,
+            response,
+            cursor,
+            limit,
+            skip,
+            *filters.criteria(),
+            order=filters.order,
+        )
+    stmt = select(Posts).where(*filters.criteria())
+    return await fetch_posts_page(
+        session, stmt, response, cursor, limit, skip, filters.order
+    )
+
+
+@router.get(
+    "/posts/search",
+    dependencies=[Depends(is_admin)],
+    response_model=list[PostResponseAdmin],
+)
+async def search_all_posts(
+    session: ReadSessionDep,
+    response: Response,
+    q: str = Query(min_length=1, max_length=256),
+    author_id: int | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=10, ge=1, le=100),
+):
+    """Полнотекстовый поиск по постам всех пользователей."""
+    criteria = [] if author_id is None else [Posts.author_id == author_id]
+    return await search_posts(session, response, q, cursor, limit, *criteria)
+
+
+@router.get("/posts/export", dependencies=[Depends(is_admin)])
+async def export_posts(
+    filters: PostFiltersDep,
+    export_format: ExportFormat = Query(default="ndjson", alias="format"),
+    author_id: int | None = None,
+):
+    """Потоковая выгрузка всех постов в NDJSON или CSV.
+
+    Фильтры и порядок те же, что у списков постов.
+    """
+    stmt = select(
+        Posts.id, Posts.text, Posts.created_at, Posts.author_id, Posts.completed
+    ).where(*filters.criteria())
+    if filters.order == "desc":
+        stmt = stmt.order_by(Posts.created_at.desc(), Posts.id.desc())
+    else:
+        stmt = stmt.order_by(Posts.created_at, Posts.id)
+    if author_id is not None:
+        stmt = stmt.where(Posts.author_id == author_id)
+    return StreamingResponse(
+        stream_rows(stmt, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="posts.{export_format}"'
+        },
+    )
 
 
 @router.put("/", dependencies=[Depends(is_admin)], response_model=AdminUserInfoResponse)
 async def update_users_role(session: SessionDep, user: UserRoleUpdate):
     """Изменение роли пользователя администратором."""
-    result = await session.execute(select(Users).where(Users.username == user.username))
-    user_to_edit = result.scalar_one_or_none()
+    user_to_edit = await session.scalar(
+        update(Users)
+        .where(Users.username == user.username)
+        .values(superuser=user.superuser)
+        .returning(Users)
+    )
     if user_to_edit is None:
         raise HTTPException(status_code=404, detail="Username not found")
-    user_to_edit.superuser = user.superuser
-    session.add(user_to_edit)
     await session.commit()
-    await session.refresh(user_to_edit)
+    principal_cache.invalidate(user_to_edit.username)
     return user_to_edit
 
 
@@ -62,7 +176,7 @@ async def update_users_role(session: SessionDep, user: UserRoleUpdate):
     dependencies=[Depends(is_admin)],
     response_model=AdminUserInfoResponse,
 )
-async def get_users_info_by_id(session: SessionDep, user_id: int):
+async def get_users_info_by_id(session: ReadSessionDep, user_id: int):
     """Получение администратором информации о пользователе по ID."""
     result = await session.execute(select(Users).where(Users.id == user_id))
     user = result.scalar_one_or_none()
@@ -71,12 +185,24 @@ async def get_users_info_by_id(session: SessionDep, user_id: int):
     return user
 
 
+@router.get(
+    "/id/{user_id}/stats",
+    dependencies=[Depends(is_admin)],
+    response_model=PostStats,
+)
+async def get_users_post_stats(session: ReadSessionDep, user_id: int):
+    """Получение администратором статистики постов пользователя."""
+    if await session.get(Users, user_id) is None:
+        raise HTTPException(status_code=404, detail="User's id not found")
+    return await get_post_stats(session, user_id)
+
+
 @router.get(
     "/username/{username}",
     dependencies=[Depends(is_admin)],
     response_model=AdminUserInfoResponse,
 )
-async def get_users_info_by_name(session: SessionDep, username: str):
+async def get_users_info_by_name(session: ReadSessionDep, username: str):
     """Получение администратором информации о пользователе по username."""
     result = await session.execute(select(Users).where(Users.username == username))
     user = result.scalar_one_or_none()
@@ -85,14 +211,58 @@ async def get_users_info_by_name(session: SessionDep, username: str):
     return user
 
 
-@router.delete("/{username}", dependencies=[Depends(is_admin)], status_code=204)
+@router.get("/stats/cache", dependencies=[Depends(is_admin)])
+async def get_cache_stats() -> dict[str, dict[str, int]]:
+    """Счетчики попаданий в кеши пользователей и токенов."""
+    return {"principal": principal_cache.stats(), "token": token_cache.stats()}
+
+
+@router.get("/stats/conditional", dependencies=[Depends(is_admin)])
+async def get_conditional_stats() -> dict[str, dict[str, float]]:
+    """Доля ответов 304 Not Modified по эндпоинтам."""
+    return conditional_stats()
+
+
+@router.get("/stats/pool", dependencies=[Depends(is_admin)])
+async def get_pool_stats() -> dict[str, Any]:
+    """Состояние пула соединений с БД."""
+    return pool_status()
+
+
+@router.delete(
+    "/{username}",
+    dependencies=[Depends(is_admin)],
+    status_code=204,
+    responses={202: {"description": "User deletion scheduled"}},
+)
 async def delete_user_by_admin(session: SessionDep, username: str):
-    """Эндпоинт для удаления пользователя из БД администратором."""
-    result = await session.execute(select(Users).where(Users.username == username))
-    user = result.scalar_one_or_none()
-    if not user:
+    """Эндпоинт для удаления пользователя из БД администратором.
+
+    Посты удаляются каскадом в той же транзакции. Если постов больше
+    USER_DELETE_SYNC_LIMIT, пользователь сразу деактивируется, а посты
+    удаляются порциями в фоне, ответ 202.
+    """
+    result = await session.execute(
+        select(Users.id, UserPostStats.total)
+        .outerjoin(UserPostStats, UserPostStats.user_id == Users.id)
+        .where(Users.username == username)
+    )
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="User not found")
-    session.add(user)
-    await session.delete(user)
+    user_id, total = row
+    background = (total or 0) > settings.USER_DELETE_SYNC_LIMIT
+    if not background and not user_purger.is_running(user_id):
+        await session.execute(delete(Users).where(Users.id == user_id))
+        await session.commit()
+        principal_cache.invalidate(username)
+        return
+    await session.execute(
+        update(Users)
+        .where(Users.id == user_id)
+        .values(is_active=False, token_version=Users.token_version + 1)
+    )
     await session.commit()
-    return
+    principal_cache.invalidate(username)
+    user_purger.start(user_id)
+    return JSONResponse(status_code=202, content={"detail": "User deletion scheduled"})
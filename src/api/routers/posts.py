@@ -1,60 +1,320 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import select
+from collections import Counter
+from collections.abc import Sequence
+from typing import Any
 
-from src.api.deps import IsUserDep, PostDep, SessionDep, is_user
-from src.models import Post, PostCompleted, PostResponse, Posts
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from sqlalchemy import ColumnElement, Integer, any_, bindparam, func, true
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import delete, insert, select, update
+
+from src.api.conditional import check_etag, list_etag, post_etag
+from src.api.deps import (
+    IsUserDep,
+    PostRefDep,
+    ReadSessionDep,
+    SessionDep,
+    get_post,
+    get_post_version,
+    raise_post_error,
+)
+from src.api.fastjson import fetch_posts_json
+from src.api.pagination import PostFiltersDep, fetch_posts_page
+from src.api.search import search_posts
+from src.api.stats import get_post_stats
+from src.core.coalescer import post_coalescer
+from src.core.config import settings
+from src.core.database import replica_router
+from src.models import (
+    BatchItemResult,
+    Post,
+    PostCompleted,
+    PostCompletedBatchItem,
+    PostIds,
+    PostResponse,
+    Posts,
+    PostStats,
+    UserPostStats,
+    Users,
+)
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
 
+def check_batch_size(items: Sequence[Any]) -> None:
+    """Ограничить размер пакета из настроек."""
+    if len(items) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch is too large, max {settings.BATCH_MAX_SIZE} items",
+        )
+
+
+def check_unique_ids(ids: list[int]) -> None:
+    """Отклонить пакет, в котором один пост указан несколько раз."""
+    duplicates = sorted(post_id for post_id, count in Counter(ids).items() if count > 1)
+    if duplicates:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Duplicate post ids in batch: {', '.join(map(str, duplicates))}",
+        )
+
+
+def ids_in(ids: list[int]) -> ColumnElement[bool]:
+    """Условие id = ANY(:ids) с одним параметром-массивом."""
+    return Posts.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+
+
+def owned_by(user: Users) -> ColumnElement[bool]:
+    """Условие доступа к постам: свои посты, для администратора все."""
+    return true() if user.superuser else Posts.author_id == user.id
+
+
+async def batch_results(
+    session: AsyncSession, ids: list[int], done: set[int]
+) -> list[BatchItemResult]:
+    """Собрать результат по каждому ID в порядке запроса.
+
+    Для необработанных ID одним запросом выясняется, нет поста (404)
+    или он чужой (403).
+    """
+    missing = list({post_id for post_id in ids if post_id not in done})
+    existing: set[int] = set()
+    if missing:
+        result = await session.execute(select(Posts.id).where(ids_in(missing)))
+        existing = set(result.scalars().all())
+    results = []
+    for post_id in ids:
+        if post_id in done:
+            results.append(BatchItemResult(id=post_id, status=200))
+        elif post_id in existing:
+            results.append(
+                BatchItemResult(
+                    id=post_id, status=403, detail="Post belongs to other user"
+                )
+            )
+        else:
+            results.append(
+                BatchItemResult(id=post_id, status=404, detail="Post not found")
+            )
+    return results
+
+
 @router.post("/", response_model=PostResponse)
 async def create_post(session: SessionDep, post: Post, user: IsUserDep):
     """Создание поста."""
-    post = Posts(text=post.text, author_id=user.id)  # type: ignore Требует так же подставить сюда created_at, который создается в Postgres
-    session.add(post)
+    if settings.POST_COALESCE_ENABLED:
+        new_post = await post_coalescer.insert(
+            {"text": post.text, "author_id": user.id}
+        )
+        replica_router.mark_write(session.info.get("sticky_key"))
+        return new_post
+    new_post = await session.scalar(
+        insert(Posts).values(text=post.text, author_id=user.id).returning(Posts)
+    )
     await session.commit()
-    await session.refresh(post)
-    return post
+    return new_post
+
+
+@router.post("/batch", response_model=list[PostResponse])
+async def create_posts_batch(session: SessionDep, posts: list[Post], user: IsUserDep):
+    """Создание нескольких постов одним INSERT."""
+    check_batch_size(posts)
+    if not posts:
+        return []
+    result = await session.scalars(
+        insert(Posts).returning(Posts, sort_by_parameter_order=True),
+        [{"text": post.text, "author_id": user.id} for post in posts],
+    )
+    created = result.all()
+    await session.commit()
+    return created
+
+
+@router.patch("/batch/completed", response_model=list[BatchItemResult])
+async def check_completed_batch(
+    session: SessionDep, items: list[PostCompletedBatchItem], user: IsUserDep
+):
+    """Пометить выполнеными (или нет) несколько постов в одной транзакции.
+
+    Один пост можно указать только один раз, иначе значения могли бы
+    противоречить друг другу.
+    """
+    check_batch_size(items)
+    check_unique_ids([item.id for item in items])
+    done: set[int] = set()
+    for completed in (True, False):
+        ids = [item.id for item in items if item.completed is completed]
+        if not ids:
+            continue
+        result = await session.execute(
+            update(Posts)
+            .where(ids_in(ids), owned_by(user))
+            .values(
+                completed=completed, version=Posts.version + 1, updated_at=func.now()
+            )
+            .returning(Posts.id)
+            .execution_options(synchronize_session=False)
+        )
+        done.update(result.scalars().all())
+    results = await batch_results(session, [item.id for item in items], done)
+    await session.commit()
+    return results
+
+
+@router.delete("/batch", response_model=list[BatchItemResult])
+async def delete_posts_batch(session: SessionDep, target: PostIds, user: IsUserDep):
+    """Удаление нескольких постов одним DELETE."""
+    check_batch_size(target.ids)
+    if not target.ids:
+        return []
+    result = await session.execute(
+        delete(Posts)
+        .where(ids_in(target.ids), owned_by(user))
+        .returning(Posts.id)
+        .execution_options(synchronize_session=False)
+    )
+    done = set(result.scalars().all())
+    results = await batch_results(session, target.ids, done)
+    await session.commit()
+    return results
+
+
+@router.get("/search", response_model=list[PostResponse])
+async def search_users_posts(
+    session: ReadSessionDep,
+    user: IsUserDep,
+    response: Response,
+    q: str = Query(min_length=1, max_length=256),
+    cursor: str | None = None,
+    limit: int = Query(default=10, ge=1, le=100),
+):
+    """Полнотекстовый поиск по своим постам."""
+    return await search_posts(
+        session, response, q, cursor, limit, Posts.author_id == user.id
+    )
+
+
+@router.get("/stats", response_model=PostStats)
+async def read_users_post_stats(session: ReadSessionDep, user: IsUserDep):
+    """Число своих постов и выполненных из них."""
+    return await get_post_stats(session, user.id)
 
 
 @router.get("/{post_id}", response_model=PostResponse)
-async def read_selected_post(post: PostDep):
-    """Получение пользователем своего поста."""
+async def read_selected_post(
+    session: SessionDep,
+    read_session: ReadSessionDep,
+    ref: PostRefDep,
+    request: Request,
+    response: Response,
+):
+    """Получение пользователем своего поста.
+
+    С If-None-Match сначала читается только версия поста, и на 304 сам
+    пост не загружается.
+    """
+    if "if-none-match" not in request.headers:
+        post = await get_post(session, read_session, ref)
+        check_etag(
+            request, response, post_etag(post.id, post.version), "read_selected_post"
+        )
+        return post
+    version = await get_post_version(session, read_session, ref)
+    not_modified = check_etag(
+        request, response, post_etag(ref.post_id, version), "read_selected_post"
+    )
+    if not_modified is not None:
+        return not_modified
+    post = await read_session.scalar(select(Posts).where(Posts.id == ref.post_id))
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    # Пост мог измениться после чтения версии.
+    response.headers["ETag"] = post_etag(post.id, post.version)
     return post
 
 
 @router.get("/", response_model=list[PostResponse])
 async def read_users_posts(
-    session: SessionDep, user: IsUserDep, skip: int = 0, limit: int = 10
+    session: ReadSessionDep,
+    user: IsUserDep,
+    request: Request,
+    response: Response,
+    filters: PostFiltersDep,
+    cursor: str | None = None,
+    limit: int = Query(default=10, ge=1, le=1000),
+    skip: int = Query(default=0, ge=0, deprecated=True),
 ):
-    """Получение пользователем всех своих постов."""
-    result = await session.execute(
-        select(Posts).where(Posts.author == user).offset(skip).limit(limit)
+    """Получение пользователем своих постов с фильтрами."""
+    stats = await session.get(UserPostStats, user.id)
+    count, revision = (stats.total, stats.revision) if stats else (0, 0)
+    etag = list_etag(user.id, count, revision, request.url.query)
+    not_modified = check_etag(request, response, etag, "read_users_posts")
+    if not_modified is not None:
+        return not_modified
+    if settings.FAST_JSON:
+        return await fetch_posts_json(
+            session,
+            PostResponse,
+            response,
+            cursor,
+            limit,
+            skip,
+            Posts.author_id == user.id,
+            *filters.criteria(),
+            order=filters.order,
+        )
+    stmt = select(Posts).where(Posts.author_id == user.id, *filters.criteria())
+    return await fetch_posts_page(
+        session, stmt, response, cursor, limit, skip, filters.order
     )
-    posts = result.scalars().all()
-    return posts
 
 
-@router.put("/{post_id}", dependencies=[Depends(is_user)], response_model=PostResponse)
-async def change_post(session: SessionDep, post: PostDep, update: Post):
+@router.put("/{post_id}", response_model=PostResponse)
+async def change_post(session: SessionDep, ref: PostRefDep, changes: Post):
     """Изменение пользователем своего поста."""
-    post.text = update.text
+    changed = await session.scalar(
+        update(Posts)
+        .where(*ref.owned())
+        .values(text=changes.text, version=Posts.version + 1, updated_at=func.now())
+        .returning(Posts)
+        .execution_options(synchronize_session=False)
+    )
+    if changed is None:
+        await raise_post_error(session, ref)
     await session.commit()
-    await session.refresh(post)
-    return post
+    return changed
 
 
 @router.patch("/{post_id}/completed", response_model=PostResponse)
-async def check_completed(session: SessionDep, post: PostDep, update: PostCompleted):
+async def check_completed(session: SessionDep, ref: PostRefDep, changes: PostCompleted):
     """Пометить пост выполненым."""
-    post.completed = update.completed
+    changed = await session.scalar(
+        update(Posts)
+        .where(*ref.owned())
+        .values(
+            completed=changes.completed,
+            version=Posts.version + 1,
+            updated_at=func.now(),
+        )
+        .returning(Posts)
+        .execution_options(synchronize_session=False)
+    )
+    if changed is None:
+        await raise_post_error(session, ref)
     await session.commit()
-    await session.refresh(post)
-    return post
+    return changed
 
 
-@router.delete("/{post_id}", dependencies=[Depends(is_user)], status_code=204)
-async def delete_post(session: SessionDep, post: PostDep):
+@router.delete("/{post_id}", status_code=204)
+async def delete_post(session: SessionDep, ref: PostRefDep):
     """Удаление пользователем своего поста."""
-    await session.delete(post)
+    deleted = await session.scalar(
+        delete(Posts)
+        .where(*ref.owned())
+        .returning(Posts.id)
+        .execution_options(synchronize_session=False)
+    )
+    if deleted is None:
+        await raise_post_error(session, ref)
     await session.commit()
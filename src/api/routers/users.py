@@ -1,16 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import insert, select, update
 
-from src.api.deps import IsUserDep, SessionDep, is_authorized
-from src.core.auth import authenticate_user, create_access_token
-from src.core.security import hash_password
-from src.models import TokenResponse, UserCreate, UserResponse, Users, UserUpdate
+from src.api.deps import (
+    IsUserDep,
+    SessionDep,
+    check_user,
+    decode_token,
+    get_principal,
+    is_authorized,
+    limit_client,
+    limit_login,
+    principal_cache,
+)
+from src.core.auth import authenticate_user, create_tokens
+from src.core.security import hash_password_async
+from src.models import (
+    RefreshRequest,
+    TokenResponse,
+    UserCreate,
+    UserResponse,
+    Users,
+    UserUpdate,
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.post("/register", response_model=UserResponse)
+@router.post(
+    "/register", response_model=UserResponse, dependencies=[Depends(limit_client)]
+)
 async def register_user(
     session: SessionDep, user: UserCreate, auth: bool = Depends(is_authorized)
 ):
@@ -23,15 +43,24 @@ async def register_user(
         raise HTTPException(status_code=409, detail="Username already taken")
     if user.password != user.repeat_password:
         raise HTTPException(status_code=409, detail="Passwords don't match")
-    hashed = hash_password(user.password)
-    new_user = Users(username=user.username, password=hashed)
-    session.add(new_user)
-    await session.commit()
-    await session.refresh(new_user)
+    hashed = await hash_password_async(user.password)
+    try:
+        new_user = await session.scalar(
+            insert(Users)
+            .values(username=user.username, password=hashed)
+            .returning(Users)
+        )
+        await session.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Username already taken")
     return new_user
 
 
-@router.post("/login", response_model=TokenResponse)
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[Depends(limit_client), Depends(limit_login)],
+)
 async def login_user(
     session: SessionDep, credentials: OAuth2PasswordRequestForm = Depends()
 ):
@@ -39,30 +68,41 @@ async def login_user(
     user = await authenticate_user(credentials.username, credentials.password, session)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="Invalid username or password")
-    access_token = create_access_token(
-        {"sub": user.username, "ver": user.token_version}
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return create_tokens(user)
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh_tokens(session: SessionDep, body: RefreshRequest):
+    """Обновление пары токенов по refresh токену без ввода пароля."""
+    username, token_version = decode_token(body.refresh_token, refresh=True)
+    user = await get_principal(session, username, token_version)
+    return create_tokens(check_user(user, token_version))
 
 
 @router.delete("/delete", response_model=UserResponse)
 async def delete_user_by_user(session: SessionDep, user: IsUserDep):
     """Удаление пользователем своего аккаунта."""
-    user.is_active = False
-    user.token_version += 1
-    session.add(user)
+    deleted = await session.scalar(
+        update(Users)
+        .where(Users.id == user.id)
+        .values(is_active=False, token_version=Users.token_version + 1)
+        .returning(Users)
+    )
     await session.commit()
-    await session.refresh(user)
-    return user
+    principal_cache.invalidate(user.username)
+    return deleted
 
 
 @router.post("/logout", status_code=204)
 async def logout_user(session: SessionDep, user: IsUserDep):
     """Выход из системы."""
-    user.token_version += 1
-    session.add(user)
+    await session.execute(
+        update(Users)
+        .where(Users.id == user.id)
+        .values(token_version=Users.token_version + 1)
+    )
     await session.commit()
-    await session.refresh(user)
+    principal_cache.invalidate(user.username)
     return
 
 
@@ -73,17 +113,16 @@ async def edit_users_info_by_user(
     """Изменение пользователем своей информации."""
     if target.password != target.repeat_password:
         raise HTTPException(status_code=409, detail="Passwords don't match")
-    if user.username != target.username:
-        result = await session.execute(
-            select(Users).where(Users.username == target.username)
+    hashed_pass = await hash_password_async(target.password)
+    try:
+        edited = await session.scalar(
+            update(Users)
+            .where(Users.id == user.id)
+            .values(username=target.username, password=hashed_pass)
+            .returning(Users)
         )
-        username_check = result.scalar_one_or_none()
-        if username_check:
-            raise HTTPException(status_code=409, detail="Username already taken")
-        user.username = target.username
-    hashed_pass = hash_password(target.password)
-    user.password = hashed_pass
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
-    return user
+        await session.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Username already taken")
+    principal_cache.invalidate(user.username)
+    return edited
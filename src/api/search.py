@@ -0,0 +1,47 @@
+from collections.abc import Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import ColumnElement, Float, cast, func, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from src.api.pagination import decode_cursor, encode_cursor
+from src.core.migrations import SEARCH_CONFIG
+from src.models import Posts
+
+search_vector = literal_column("posts.search_vector", type_=TSVECTOR)
+
+
+async def search_posts(
+    session: AsyncSession,
+    response: Response,
+    q: str,
+    cursor: str | None,
+    limit: int,
+    *criteria: ColumnElement[bool],
+) -> Sequence[Posts]:
+    """Найти посты по тексту, самые релевантные первыми.
+
+    Совпадения ищутся по GIN индексу на posts.search_vector. Страницы
+    упорядочены по (rank, id) по убыванию, курсор следующей страницы
+    возвращается в заголовке X-Next-Cursor.
+    """
+    query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), q)
+    # ts_rank возвращает real. В курсоре ранг хранится как float, поэтому
+    # сравниваем в double precision, иначе граница страницы сдвигается.
+    rank = cast(func.ts_rank(search_vector, query), Float(53))
+    stmt = select(Posts, rank).where(search_vector.op("@@")(query), *criteria)
+    if cursor is not None:
+        last_rank, last_id = decode_cursor(cursor, 2)
+        if not isinstance(last_rank, (int, float)) or not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(tuple_(rank, Posts.id) < tuple_(last_rank, last_id))
+    result = await session.execute(
+        stmt.order_by(rank.desc(), Posts.id.desc()).limit(limit)
+    )
+    rows = result.all()
+    if len(rows) == limit:
+        last_post, last_rank = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last_rank, last_post.id)
+    return [post for post, _ in rows]
@@ -0,0 +1,14 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import PostStats, UserPostStats
+
+
+async def get_post_stats(session: AsyncSession, user_id: int) -> PostStats:
+    """Прочитать счетчики постов пользователя по первичному ключу.
+
+    У пользователя без постов строки может не быть, тогда все нули.
+    """
+    stats = await session.get(UserPostStats, user_id)
+    if stats is None:
+        return PostStats()
+    return PostStats(total=stats.total, completed=stats.completed)
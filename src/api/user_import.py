@@ -0,0 +1,145 @@
+import codecs
+import csv
+from collections.abc import AsyncIterator, Sequence
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import String, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from src.core.config import settings
+from src.core.security import hash_passwords_async
+from src.models import UserImportResult, UserImportRow, Users
+
+CSV_HEADER = ["username", "password"]
+
+
+async def read_csv_lines(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, list[str]]]:
+    """Разобрать поток байтов CSV на строки, не держа весь файл в памяти.
+
+    Каждая запись должна занимать одну строку файла. Возвращает пары
+    (номер строки, поля).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    number = 0
+    async for chunk in chunks:
+        try:
+            text = tail + decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV must be UTF-8")
+        lines = text.split("\n")
+        tail = lines.pop()
+        for fields in csv.reader(lines):
+            number += 1
+            yield number, fields
+    tail += decoder.decode(b"", final=True)
+    if tail.strip():
+        for fields in csv.reader([tail]):
+            number += 1
+            yield number, fields
+
+
+async def import_chunk(
+    session: AsyncSession, rows: Sequence[tuple[int, UserImportRow]]
+) -> list[UserImportResult]:
+    """Создать пользователей из пачки уже проверенных строк.
+
+    Занятые имена ищутся одним запросом, пароли хешируются параллельно,
+    вставка идет одним INSERT ... ON CONFLICT DO NOTHING, поэтому имя,
+    занятое параллельно, тоже попадает в отчет, а не роняет пачку.
+    """
+    usernames = [row.username for _, row in rows]
+    taken = set(
+        await session.scalars(
+            select(Users.username).where(
+                Users.username
+                == any_(bindparam("usernames", usernames, type_=ARRAY(String)))
+            )
+        )
+    )
+    fresh = [(line, row) for line, row in rows if row.username not in taken]
+    hashes = await hash_passwords_async([row.password for _, row in fresh])
+    created: dict[str, int] = {}
+    if fresh:
+        result = await session.execute(
+            insert(Users)
+            .values(
+                [
+                    {"username": row.username, "password": hashed}
+                    for (_, row), hashed in zip(fresh, hashes)
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[Users.username])
+            .returning(Users.username, Users.id)
+        )
+        created = dict(result.tuples().all())
+        await session.commit()
+    return [
+        (
+            UserImportResult(
+                line=line, username=row.username, status=201, id=created[row.username]
+            )
+            if row.username in created
+            else UserImportResult(
+                line=line,
+                username=row.username,
+                status=409,
+                detail="Username already taken",
+            )
+        )
+        for line, row in rows
+    ]
+
+
+async def import_users(
+    session: AsyncSession, chunks: AsyncIterator[bytes]
+) -> list[UserImportResult]:
+    """Импортировать пользователей из CSV с заголовком username,password.
+
+    Строки обрабатываются пачками по USER_IMPORT_CHUNK_SIZE, каждая
+    пачка коммитится отдельно. Ошибки отдельных строк попадают в отчет.
+    """
+    report: list[UserImportResult] = []
+    pending: list[tuple[int, UserImportRow]] = []
+    seen: set[str] = set()
+    lines = read_csv_lines(chunks)
+    async for number, fields in lines:
+        if number == 1:
+            if [field.strip().lower() for field in fields] != CSV_HEADER:
+                raise HTTPException(
+                    status_code=400, detail="CSV header must be username,password"
+                )
+            continue
+        if not fields:
+            continue
+        username = fields[0]
+        if len(fields) != len(CSV_HEADER):
+            detail = "Expected 2 columns"
+        elif username in seen:
+            detail = "Duplicate username in file"
+        else:
+            try:
+                row = UserImportRow(username=username, password=fields[1])
+            except ValidationError as error:
+                detail = "; ".join(
+                    f"{item['loc'][0]}: {item['msg']}" for item in error.errors()
+                )
+            else:
+                seen.add(username)
+                pending.append((number, row))
+                if len(pending) >= settings.USER_IMPORT_CHUNK_SIZE:
+                    report += await import_chunk(session, pending)
+                    pending = []
+                continue
+        report.append(
+            UserImportResult(line=number, username=username, status=422, detail=detail)
+        )
+    if pending:
+        report += await import_chunk(session, pending)
+    report.sort(key=lambda result: result.line)
+    return report
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+from src.api.deps import PostRef, get_principal, load_post
+from src.api.pagination import SortOrder, fetch_posts_page
+from src.core.config import settings
+from src.core.database import (
+    async_session,
+    engine,
+    replica_engines,
+    replica_router,
+    warm_pool,
+)
+from src.models import Posts
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["health"])
+
+ORDERS: tuple[SortOrder, ...] = ("asc", "desc")
+
+
+async def prime_queries(session: AsyncSession) -> None:
+    """Выполнить горячие запросы с несуществующими значениями.
+
+    SQLAlchemy компилирует каждый запрос при первом выполнении и кеширует
+    результат, поэтому первые настоящие запросы берут его из кеша.
+    """
+    await get_principal(session, "", 0)
+    with suppress(HTTPException):
+        await load_post(session, PostRef(0, "", 0))
+    stmt = select(Posts).where(Posts.author_id == 0)
+    for order in ORDERS:
+        await fetch_posts_page(session, stmt, Response(), None, 10, order=order)
+
+
+async def warm_engine(
+    target: AsyncEngine, make_session: async_sessionmaker[AsyncSession]
+) -> None:
+    """Открыть соединения пула движка и прогнать на нем горячие запросы."""
+    await warm_pool(target, min(settings.DB_WARMUP_CONNECTIONS, settings.DB_POOL_SIZE))
+    async with make_session() as session:
+        await prime_queries(session)
+
+
+async def warm_up() -> None:
+    """Прогреть основную БД, затем реплики.
+
+    Недоступная реплика исключается из ротации и не мешает прогреву.
+    """
+    await warm_engine(engine, async_session)
+    for index, replica in enumerate(replica_engines):
+        try:
+            await warm_engine(replica, replica_router.replicas[index])
+        except (OSError, exc.DBAPIError, exc.TimeoutError):
+            replica_router.mark_down(index)
+
+
+class Warmup:
+    """Фоновый прогрев после старта приложения.
+
+    Пока он идет, /ready отвечает 503, и балансировщик не шлет запросы на
+    холодный воркер. Если прогрев упал, например основная БД недоступна,
+    ошибка пишется в лог, и прогрев повторяется каждые retry_seconds секунд.
+    """
+
+    def __init__(self, retry_seconds: float = 1.0) -> None:
+        self.retry_seconds = retry_seconds
+        self.ready = False
+        self.seconds: float | None = None
+        self.error: str | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self.ready = False
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        started = time.perf_counter()
+        while True:
+            try:
+                await warm_up()
+                break
+            except Exception as error:
+                # Отмена не ловится и прерывает повторы.
+                self.error = type(error).__name__
+                logger.exception("Warm-up failed, retrying in %s s", self.retry_seconds)
+                await asyncio.sleep(self.retry_seconds)
+        self.seconds = time.perf_counter() - started
+        self.error = None
+        self.ready = True
+
+    async def wait(self) -> None:
+        """Дождаться окончания прогрева."""
+        if self._task is not None:
+            await self._task
+
+    async def stop(self) -> None:
+        """Прервать прогрев при остановке приложения."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+
+warmup = Warmup()
+
+
+@router.get("/ready", include_in_schema=False)
+async def read_ready():
+    """Готовность воркера принимать трафик."""
+    if not warmup.ready:
+        detail = "Warming up" if warmup.error is None else f"Warming up: {warmup.error}"
+        return JSONResponse({"detail": detail}, status_code=503)
+    return {"detail": "Ready", "warmup_seconds": warmup.seconds}
@@ -6,12 +6,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
 from src.core.config import settings
-from src.core.security import verify_password
+from src.core.security import verify_password_async
 from src.models import Users
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
+REFRESH_TOKEN_TYPE = "refresh"
 
 
 async def authenticate_user(
@@ -20,7 +21,7 @@ async def authenticate_user(
     """Авторизовать пользователя."""
     result = await session.execute(select(Users).where(Users.username == username))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(password, user.password):
+    if not user or not await verify_password_async(password, user.password):
         raise HTTPException(status_code=401, detail="Username or password is incorrect")
     return user
 
@@ -35,3 +36,28 @@ def create_access_token(data: dict[str, str | int | datetime]) -> str:
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, ALGORITHM)
     return encoded_jwt
+
+
+def create_refresh_token(data: dict[str, str | int | datetime]) -> str:
+    """Создать refresh токен.
+
+    Содержит те же username и token_version, поэтому отзывается вместе
+    с access токеном при выходе или удалении аккаунта.
+    """
+    to_encode = data.copy()
+    expire = datetime.now() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "typ": REFRESH_TOKEN_TYPE})
+    return jwt.encode(to_encode, SECRET_KEY, ALGORITHM)
+
+
+def create_tokens(user: Users) -> dict[str, str]:
+    """Выдать пару access и refresh токенов пользователю."""
+    data: dict[str, str | int | datetime] = {
+        "sub": user.username,
+        "ver": user.token_version,
+    }
+    return {
+        "access_token": create_access_token(data),
+        "refresh_token": create_refresh_token(data),
+        "token_type": "bearer",
+    }
@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, TypeVar
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from src.models import Users
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Ограниченный по размеру LRU-кеш с временем жизни записей.
+
+    Рассчитан на один event loop воркера, поэтому без блокировок.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        """Вернуть значение или None, если записи нет или она устарела."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= time.time():
+            self._evict(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, expires_at: float | None = None) -> None:
+        """Сохранить значение до expires_at (по умолчанию на ttl секунд)."""
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._evict(next(iter(self._data)))
+
+    def pop(self, key: K) -> None:
+        """Удалить запись, если она есть."""
+        if key in self._data:
+            self._evict(key)
+
+    def clear(self) -> None:
+        """Очистить кеш и счетчики."""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """Вернуть размер кеша и счетчики попаданий."""
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def _evict(self, key: K) -> None:
+        del self._data[key]
+
+
+class PrincipalCache(TTLCache[tuple[str, int], dict[str, Any]]):
+    """Кеш строк Users по (username, token_version).
+
+    Хранит снимок колонок, а не ORM объект, чтобы запросы
+    не делили между собой один экземпляр.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize, ttl)
+        self._versions: dict[str, set[int]] = {}
+
+    def get_user(self, username: str, token_version: int) -> Users | None:
+        """Вернуть отсоединенный от сессии объект пользователя из кеша."""
+        data = self.get((username, token_version))
+        if data is None:
+            return None
+        user = Users(**data)
+        make_transient_to_detached(user)
+        return user
+
+    def set_user(self, token_version: int, user: Users) -> None:
+        """Сохранить пользователя под версией токена из запроса."""
+        self.set((user.username, token_version), user.model_dump())
+
+    def set(
+        self,
+        key: tuple[str, int],
+        value: dict[str, Any],
+        expires_at: float | None = None,
+    ) -> None:
+        super().set(key, value, expires_at)
+        if key in self._data:
+            self._versions.setdefault(key[0], set()).add(key[1])
+
+    def invalidate(self, username: str) -> None:
+        """Удалить все записи пользователя."""
+        for token_version in self._versions.pop(username, set()):
+            self._data.pop((username, token_version), None)
+
+    def clear(self) -> None:
+        super().clear()
+        self._versions.clear()
+
+    def _evict(self, key: tuple[str, int]) -> None:
+        super()._evict(key)
+        versions = self._versions.get(key[0])
+        if versions is not None:
+            versions.discard(key[1])
+            if not versions:
+                del self._versions[key[0]]
@@ -0,0 +1,100 @@
+import asyncio
+from typing import Any
+
+from sqlmodel import insert
+
+from src.core.config import settings
+from src.core.database import async_session
+from src.models import Posts
+
+
+class InsertCoalescer:
+    """Склеивает параллельные INSERT постов в один multi-row INSERT.
+
+    Запросы, пришедшие в течение window секунд (или пока не набралось
+    max_items), пишутся одной транзакцией, и каждый получает свою строку.
+    Если пакет не записался, строки повторяются по одной, чтобы ошибка
+    досталась только своему запросу.
+    """
+
+    def __init__(self, window: float, max_items: int):
+        self.window = window
+        self.max_items = max_items
+        self.flushes = 0
+        self.items = 0
+        self._queue: list[tuple[dict[str, Any], asyncio.Future[Posts]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def insert(self, values: dict[str, Any]) -> Posts:
+        """Поставить строку в очередь и дождаться созданного поста."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Posts] = loop.create_future()
+        self._queue.append((values, future))
+        if len(self._queue) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._write(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._fail_pending(batch))
+
+    @staticmethod
+    def _fail_pending(
+        batch: list[tuple[dict[str, Any], asyncio.Future[Posts]]],
+    ) -> None:
+        """Ответить ошибкой тем, кому запись не ответила.
+
+        Так бывает, если задачу записи отменили при остановке, в том числе
+        до ее запуска, когда finally внутри _write не выполнился бы.
+        """
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Post insert was cancelled"))
+
+    async def _write(
+        self, batch: list[tuple[dict[str, Any], asyncio.Future[Posts]]]
+    ) -> None:
+        try:
+            async with async_session() as session:
+                result = await session.scalars(
+                    insert(Posts).returning(Posts, sort_by_parameter_order=True),
+                    [values for values, _ in batch],
+                )
+                posts = result.all()
+                await session.commit()
+        except Exception as error:
+            if len(batch) > 1:
+                for item in batch:
+                    await self._write([item])
+                return
+            future = batch[0][1]
+            if not future.done():
+                future.set_exception(error)
+            return
+        self.flushes += 1
+        self.items += len(batch)
+        for (_, future), post in zip(batch, posts):
+            if not future.done():
+                future.set_result(post)
+
+    async def stop(self) -> None:
+        """Записать то, что осталось в очереди, и дождаться записи."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+post_coalescer = InsertCoalescer(
+    settings.POST_COALESCE_WINDOW_MS / 1000, settings.POST_COALESCE_MAX_ITEMS
+)
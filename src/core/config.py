@@ -1,4 +1,5 @@
 import asyncio
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -18,10 +19,68 @@ class Settings(BaseSettings):
     ADMIN_PASS: str
     DROP_TABLE: bool
 
+    DB_POOL_SIZE: int = 15
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_QUERY_CACHE_SIZE: int = 500
+    DB_PREPARE_THRESHOLD: int | None = 5
+    DB_PGBOUNCER: bool = False
+    DB_WARMUP_CONNECTIONS: int = 5
+
+    DB_REPLICA_URLS: str = ""
+    REPLICA_STICKY_SECONDS: float = 5.0
+    REPLICA_RETRY_SECONDS: float = 30.0
+
+    HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    HASH_WORKERS: int | None = None
+    HASH_QUEUE_LIMIT: int = 64
+
+    LOGIN_RATE_PER_MINUTE: float = 10.0
+    LOGIN_RATE_BURST: int = 5
+    CLIENT_RATE_PER_MINUTE: float = 120.0
+    CLIENT_RATE_BURST: int = 30
+    RATE_LIMIT_KEYS: int = 10000
+
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 30.0
+    TOKEN_CACHE_SIZE: int = 10000
+
+    METRICS_ENABLED: bool = True
+    FAST_JSON: bool = False
+
+    POST_COALESCE_ENABLED: bool = False
+    POST_COALESCE_WINDOW_MS: float = 2.0
+    POST_COALESCE_MAX_ITEMS: int = 100
+
+    BATCH_MAX_SIZE: int = 500
+    EXPORT_CHUNK_SIZE: int = 1000
+    USER_IMPORT_CHUNK_SIZE: int = 1000
+    USER_DELETE_SYNC_LIMIT: int = 10000
+    USER_DELETE_CHUNK_SIZE: int = 10000
+    POSTS_PARTITIONED: bool = False
+    POSTS_PARTITION_MONTHS_AHEAD: int = 3
+    POSTS_RETENTION_MONTHS: int = 24
+
     @property
     def DATABASE_URL(self):
         return f"postgresql+psycopg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def REPLICA_URLS(self) -> list[str]:
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def DB_CONNECT_ARGS(self) -> dict[str, int | None]:
+        # В режиме transaction pooling PgBouncer подготовленные выражения
+        # psycopg попадают на чужие серверные соединения, поэтому отключаем их.
+        if self.DB_PGBOUNCER:
+            return {"prepare_threshold": None}
+        return {"prepare_threshold": self.DB_PREPARE_THRESHOLD}
+
     @property
     def SECRET_KEY(self):
         return self.TOKEN_KEY
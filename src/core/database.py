@@ -1,26 +1,245 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import time
+from collections.abc import Sequence
+from contextlib import AsyncExitStack
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 from sqlmodel import SQLModel
 
+from src.core.cache import TTLCache
 from src.core.config import settings
+from src.core.metrics import pool_metrics, record_query
+from src.core.migrations import upgrade_schema
+from src.core.partitions import partition_posts
 from src.core.security import hash_password
 from src.models import Posts, Users
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False, pool_size=15)
 
-async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание свободного соединения и таймауты."""
 
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.wait.observe(time.perf_counter() - start)
+        return entry
 
-async def init_db():
-    """Создать базу данных, если в .env стоит DROP_TABLE=true.
 
-    Так же, создается первый администратор и тестовый пользователь.
+def count_checkout(*args: Any) -> None:
+    pool_metrics.checkouts += 1
+
+
+def count_connect(*args: Any) -> None:
+    pool_metrics.connects += 1
+
+
+def start_query_timer(conn: Any, *args: Any) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def stop_query_timer(conn: Any, *args: Any) -> None:
+    record_query(time.perf_counter() - conn.info["query_start"].pop())
+
+
+def drop_query_timer(context: Any) -> None:
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+def make_engine(url: str) -> AsyncEngine:
+    """Создать движок с настройками пула из .env и счетчиками метрик.
+
+    Счетчики пула и запросов общие для основной БД и реплик.
     """
-    if not settings.DROP_TABLE:
-        return
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        connect_args=settings.DB_CONNECT_ARGS,
+    )
+    sync_engine = new_engine.sync_engine
+    event.listen(sync_engine, "checkout", count_checkout)
+    event.listen(sync_engine, "connect", count_connect)
+    event.listen(sync_engine, "before_cursor_execute", start_query_timer)
+    event.listen(sync_engine, "after_cursor_execute", stop_query_timer)
+    event.listen(sync_engine, "handle_error", drop_query_timer)
+    return new_engine
+
+
+engine = make_engine(settings.DATABASE_URL)
+replica_engines = [make_engine(url) for url in settings.REPLICA_URLS]
+
+
+def pool_status() -> dict[str, Any]:
+    """Текущее состояние пула и накопленные счетчики."""
+    pool = engine.sync_engine.pool
+    assert isinstance(pool, InstrumentedPool)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "checkouts": pool_metrics.checkouts,
+        "connects": pool_metrics.connects,
+        "timeouts": pool_metrics.timeouts,
+        "wait_seconds": pool_metrics.wait.snapshot(),
+    }
+
+
+async def warm_pool(target: AsyncEngine, count: int) -> None:
+    """Открыть count соединений пула, держа их разом, и проверить каждое."""
+    async with AsyncExitStack() as stack:
+        for _ in range(count):
+            conn = await stack.enter_async_context(target.connect())
+            await conn.exec_driver_sql("SELECT 1")
+
+
+async def dispose_engines() -> None:
+    """Закрыть соединения основной БД и реплик."""
+    for target in (engine, *replica_engines):
+        await target.dispose()
+
+
+class PrimarySession(Session):
+    """Сессия основной БД, которая помнит, были ли в ней записи."""
 
+
+async_session = async_sessionmaker(
+    engine,
+    class_=AsyncSession,
+    sync_session_class=PrimarySession,
+    expire_on_commit=False,
+)
+
+
+class ReplicaRouter:
+    """Распределяет сессии только для чтения по репликам по кругу.
+
+    Реплика, к которой не удалось подключиться, пропускается retry_after
+    секунд, а если живых реплик нет, чтение идет в основную БД. После
+    записи ключ (заголовок Authorization) sticky_seconds секунд читает из
+    основной БД, чтобы клиент видел свои изменения несмотря на отставание
+    реплик. Окно хранится в памяти воркера.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[async_sessionmaker[AsyncSession]],
+        primary: async_sessionmaker[AsyncSession],
+        retry_after: float,
+        sticky_seconds: float,
+    ):
+        self.replicas = list(replicas)
+        self.primary = primary
+        self.retry_after = retry_after
+        self.down_until = [0.0] * len(self.replicas)
+        self.recent_writes = TTLCache[str, bool](10000, sticky_seconds)
+        self._next = 0
+
+    def mark_write(self, key: str | None) -> None:
+        """Запомнить запись, чтобы следующие чтения шли в основную БД."""
+        if self.replicas and key is not None:
+            self.recent_writes.set(key, True)
+
+    def mark_down(self, index: int) -> None:
+        """Временно исключить реплику из ротации."""
+        self.down_until[index] = time.monotonic() + self.retry_after
+
+    def candidates(self, key: str | None = None) -> list[int]:
+        """Номера реплик в порядке обхода для очередного чтения."""
+        if not self.replicas:
+            return []
+        if key is not None and self.recent_writes.get(key):
+            return []
+        count = len(self.replicas)
+        start = self._next
+        self._next = (start + 1) % count
+        now = time.monotonic()
+        return [
+            index
+            for index in ((start + offset) % count for offset in range(count))
+            if self.down_until[index] <= now
+        ]
+
+    async def open(self, key: str | None = None) -> AsyncSession:
+        """Открыть сессию на живой реплике или на основной БД."""
+        for index in self.candidates(key):
+            session = self.replicas[index]()
+            try:
+                # Соединение берем сразу, чтобы упавшая реплика
+                # обнаружилась здесь, а не посреди обработчика.
+                await session.connection()
+            except (OSError, exc.DBAPIError, exc.TimeoutError):
+                await session.close()
+                self.mark_down(index)
+                continue
+            session.info["replica"] = True
+            return session
+        return self.primary()
+
+
+replica_router = ReplicaRouter(
+    [
+        async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+        for replica in replica_engines
+    ],
+    async_session,
+    settings.REPLICA_RETRY_SECONDS,
+    settings.REPLICA_STICKY_SECONDS,
+)
+
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def track_orm_write(state: ORMExecuteState) -> None:
+    if not state.is_select:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def track_flush(session: Session, *args: Any) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def stick_to_primary(session: Session) -> None:
+    if session.info.pop("wrote", False):
+        replica_router.mark_write(session.info.get("sticky_key"))
+
+
+async def init_db():
+    """Создать недостающие таблицы и обновить схему существующих.
+
+    Если в .env стоит DROP_TABLE=true, база пересоздается с нуля,
+    и создается первый администратор и тестовый пользователь.
+    """
     async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.drop_all)
+        if settings.DROP_TABLE:
+            await conn.run_sync(SQLModel.metadata.drop_all)
         await conn.run_sync(SQLModel.metadata.create_all, checkfirst=True)
+        await upgrade_schema(conn)
+        if settings.POSTS_PARTITIONED:
+            await partition_posts(conn)
+
+    if not settings.DROP_TABLE:
+        return
 
     user_admin = Users(
         username="admin", password=hash_password(settings.ADMIN_PASS), superuser=True
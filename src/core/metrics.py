@@ -0,0 +1,147 @@
+"""Счетчики приложения.
+
+Все значения живут в памяти воркера и меняются только из его event loop,
+поэтому обходятся без блокировок. Каждый воркер отдает свои значения,
+суммирует их Prometheus.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any
+
+# Границы корзин гистограмм, в секундах (кроме QUERIES_PER_REQUEST_BUCKETS).
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+REQUEST_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+QUERY_LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 1.0)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, как в Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Учесть одно значение."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Вернуть пары (верхняя граница, накопленное количество)."""
+        result = []
+        total = 0
+        for bound, count in zip((*map(str, self.buckets), "+Inf"), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self) -> dict[str, Any]:
+        """Вернуть накопительные счетчики по корзинам, сумму и количество."""
+        return {
+            "buckets": dict(self.cumulative()),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class PoolMetrics:
+    """Счетчики пула соединений с БД."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait = Histogram(POOL_WAIT_BUCKETS)
+
+
+pool_metrics = PoolMetrics()
+
+# endpoint -> [всего запросов, из них 304]
+conditional_requests: defaultdict[str, list[int]] = defaultdict(lambda: [0, 0])
+
+
+def record_conditional(endpoint: str, not_modified: bool) -> None:
+    """Учесть запрос к эндпоинту с поддержкой ETag."""
+    counters = conditional_requests[endpoint]
+    counters[0] += 1
+    if not_modified:
+        counters[1] += 1
+
+
+def conditional_stats() -> dict[str, dict[str, float]]:
+    """Вернуть число запросов, число ответов 304 и их долю по эндпоинтам."""
+    return {
+        endpoint: {
+            "requests": total,
+            "not_modified": not_modified,
+            "ratio": not_modified / total if total else 0.0,
+        }
+        for endpoint, (total, not_modified) in conditional_requests.items()
+    }
+
+
+class RequestDbStats:
+    """Число и суммарное время запросов к БД в рамках одного HTTP запроса."""
+
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+
+
+current_db_stats: ContextVar[RequestDbStats | None] = ContextVar(
+    "current_db_stats", default=None
+)
+
+# (method, route, status) -> количество
+http_requests: defaultdict[tuple[str, str, int], int] = defaultdict(int)
+# (method, route) -> гистограмма
+http_latency: defaultdict[tuple[str, str], Histogram] = defaultdict(
+    lambda: Histogram(REQUEST_LATENCY_BUCKETS)
+)
+http_db_queries: defaultdict[tuple[str, str], Histogram] = defaultdict(
+    lambda: Histogram(QUERIES_PER_REQUEST_BUCKETS)
+)
+http_db_time: defaultdict[tuple[str, str], Histogram] = defaultdict(
+    lambda: Histogram(REQUEST_LATENCY_BUCKETS)
+)
+db_query_latency = Histogram(QUERY_LATENCY_BUCKETS)
+
+
+def record_query(seconds: float) -> None:
+    """Учесть выполненный запрос к БД."""
+    db_query_latency.observe(seconds)
+    stats = current_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += seconds
+
+
+def record_request(
+    method: str, route: str, status: int, seconds: float, db: RequestDbStats
+) -> None:
+    """Учесть обработанный HTTP запрос."""
+    http_requests[method, route, status] += 1
+    http_latency[method, route].observe(seconds)
+    http_db_queries[method, route].observe(db.queries)
+    http_db_time[method, route].observe(db.seconds)
@@ -0,0 +1,166 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Ключ advisory lock, чтобы воркеры не выполняли миграции одновременно.
+MIGRATION_LOCK_KEY = 7301
+
+# Конфигурация полнотекстового поиска. 'simple' не зависит от языка постов.
+SEARCH_CONFIG = "simple"
+
+# Идемпотентные шаги обновления схемы. Выполняются при каждом старте,
+# поэтому каждый шаг должен проверять, нужен ли он.
+UPGRADES: list[str] = [
+    # posts.created_at: строка с UTC временем -> timestamptz.
+    """
+    DO $$
+    BEGIN
+        IF (
+            SELECT data_type FROM information_schema.columns
+            WHERE table_schema = current_schema()
+                AND table_name = 'posts' AND column_name = 'created_at'
+        ) <> 'timestamp with time zone' THEN
+            ALTER TABLE posts ALTER COLUMN created_at DROP DEFAULT;
+            ALTER TABLE posts ALTER COLUMN created_at TYPE timestamptz
+                USING created_at::timestamp AT TIME ZONE 'UTC';
+            UPDATE posts SET created_at = now() WHERE created_at IS NULL;
+            ALTER TABLE posts ALTER COLUMN created_at SET DEFAULT now();
+            ALTER TABLE posts ALTER COLUMN created_at SET NOT NULL;
+        END IF;
+    END $$
+    """,
+    # Раньше уникальность username проверялась только в коде, поэтому
+    # перед созданием индекса ищем дубликаты и останавливаем старт с
+    # понятной ошибкой вместо сбоя построения индекса.
+    """
+    DO $$
+    BEGIN
+        IF to_regclass('ix_users_username') IS NULL AND EXISTS (
+            SELECT 1 FROM users GROUP BY username HAVING count(*) > 1
+        ) THEN
+            RAISE EXCEPTION 'users.username has duplicates, cannot create ix_users_username'
+                USING HINT = 'Find them with: SELECT username, count(*) FROM users'
+                    || ' GROUP BY username HAVING count(*) > 1; rename or delete'
+                    || ' the extra rows and restart.';
+        END IF;
+    END $$
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username)",
+    "CREATE INDEX IF NOT EXISTS ix_posts_author_created_id"
+    " ON posts (author_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_posts_created_id ON posts (created_at, id)",
+    # Колонка для поиска не описана в модели Posts, чтобы ORM не читал
+    # ее в каждом SELECT и RETURNING.
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector"
+    f" GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', text)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector"
+    " ON posts USING gin (search_vector)",
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1",
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS updated_at timestamptz"
+    " NOT NULL DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_posts_author_updated ON posts (author_id, updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_posts_author_open"
+    " ON posts (author_id, created_at, id) WHERE NOT completed",
+    # posts.author_id: ON DELETE CASCADE, чтобы пользователь удалялся
+    # одним DELETE без загрузки постов.
+    """
+    DO $$
+    DECLARE
+        fk name;
+    BEGIN
+        SELECT conname INTO fk FROM pg_constraint
+        WHERE conrelid = 'posts'::regclass AND contype = 'f'
+            AND confrelid = 'users'::regclass AND confdeltype <> 'c';
+        IF fk IS NOT NULL THEN
+            EXECUTE 'ALTER TABLE posts DROP CONSTRAINT ' || quote_ident(fk);
+            ALTER TABLE posts ADD CONSTRAINT posts_author_id_fkey
+                FOREIGN KEY (author_id) REFERENCES users (id) ON DELETE CASCADE;
+        END IF;
+    END $$
+    """,
+    # user_post_stats: счетчики постов по авторам. Триггеры уровня
+    # оператора получают все затронутые строки разом, поэтому пакетные
+    # INSERT/UPDATE/DELETE обновляют каждого автора один раз. revision
+    # растет при любом изменении постов автора и служит для ETag списка.
+    "ALTER TABLE user_post_stats ADD COLUMN IF NOT EXISTS revision integer"
+    " NOT NULL DEFAULT 0",
+    """
+    CREATE OR REPLACE FUNCTION user_post_stats_apply() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO user_post_stats AS s (user_id, total, completed, revision)
+            SELECT author_id, count(*), count(*) FILTER (WHERE completed), 1
+            FROM new_rows GROUP BY author_id
+            ON CONFLICT (user_id) DO UPDATE
+            SET total = s.total + excluded.total,
+                completed = s.completed + excluded.completed,
+                revision = s.revision + 1;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE user_post_stats AS s
+            SET total = s.total - d.total, completed = s.completed - d.completed,
+                revision = s.revision + 1
+            FROM (
+                SELECT author_id, count(*) AS total,
+                    count(*) FILTER (WHERE completed) AS completed
+                FROM old_rows GROUP BY author_id
+            ) AS d
+            WHERE s.user_id = d.author_id;
+        ELSE
+            -- Без фильтра по изменившимся счетчикам: правка текста тоже
+            -- должна сменить revision.
+            INSERT INTO user_post_stats AS s (user_id, total, completed, revision)
+            SELECT author_id, sum(total), sum(completed), 1
+            FROM (
+                SELECT author_id, 1 AS total, completed::int AS completed
+                FROM new_rows
+                UNION ALL
+                SELECT author_id, -1, -completed::int FROM old_rows
+            ) AS d
+            GROUP BY author_id
+            ON CONFLICT (user_id) DO UPDATE
+            SET total = s.total + excluded.total,
+                completed = s.completed + excluded.completed,
+                revision = s.revision + 1;
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    # Триггеры создаются один раз вместе с пересчетом счетчиков по уже
+    # существующим постам. Запись в posts на это время блокируется.
+    # Строки счетчиков не удаляются, а revision растет: иначе ETag списка,
+    # выданный до пересчета, мог бы совпасть с другим состоянием после.
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = 'user_post_stats_insert'
+                AND tgrelid = 'posts'::regclass
+        ) THEN
+            LOCK TABLE posts IN SHARE ROW EXCLUSIVE MODE;
+            UPDATE user_post_stats
+            SET total = 0, completed = 0, revision = revision + 1;
+            INSERT INTO user_post_stats AS s (user_id, total, completed, revision)
+            SELECT author_id, count(*), count(*) FILTER (WHERE completed), 1
+            FROM posts GROUP BY author_id
+            ON CONFLICT (user_id) DO UPDATE
+            SET total = excluded.total, completed = excluded.completed;
+            CREATE TRIGGER user_post_stats_insert AFTER INSERT ON posts
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION user_post_stats_apply();
+            CREATE TRIGGER user_post_stats_update AFTER UPDATE ON posts
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION user_post_stats_apply();
+            CREATE TRIGGER user_post_stats_delete AFTER DELETE ON posts
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION user_post_stats_apply();
+        END IF;
+    END $$
+    """,
+]
+
+
+async def upgrade_schema(conn: AsyncConnection) -> None:
+    """Привести существующие таблицы к текущей схеме без пересоздания."""
+    await conn.exec_driver_sql(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_KEY})")
+    for statement in UPGRADES:
+        await conn.exec_driver_sql(statement)
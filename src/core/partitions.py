@@ -0,0 +1,234 @@
+"""Помесячное секционирование posts по created_at и архивирование.
+
+Включается настройкой POSTS_PARTITIONED. При старте обычная таблица
+posts один раз превращается в секционированную: старая таблица
+становится секцией posts_legacy со всеми прежними строками, а новые
+месяцы получают свои секции. Запросы к posts не меняются, а условия по
+created_at отсекают лишние секции.
+
+Обслуживание вручную или по cron:
+    python -m src.core.partitions ensure
+    python -m src.core.partitions archive --retention-months 24 [--move]
+"""
+
+import argparse
+import asyncio
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.core.config import settings
+from src.core.migrations import MIGRATION_LOCK_KEY, upgrade_schema
+
+ARCHIVE_TABLE = "posts_archive"
+STATS_TRIGGERS = (
+    "user_post_stats_insert",
+    "user_post_stats_update",
+    "user_post_stats_delete",
+)
+
+UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+# Старую таблицу переименовываем вместе с индексами и снимаем с нее
+# первичный ключ: у секции он должен включать ключ секционирования.
+CONVERT_STEPS: list[str] = [
+    "LOCK TABLE posts IN ACCESS EXCLUSIVE MODE",
+    *(f"DROP TRIGGER IF EXISTS {name} ON posts" for name in STATS_TRIGGERS),
+    "ALTER TABLE posts RENAME TO posts_legacy",
+    """
+    DO $$
+    DECLARE
+        r record;
+    BEGIN
+        FOR r IN
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = 'posts_legacy'::regclass AND contype = 'p'
+        LOOP
+            EXECUTE 'ALTER TABLE posts_legacy DROP CONSTRAINT ' || quote_ident(r.conname);
+        END LOOP;
+        FOR r IN
+            SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'posts_legacy'::regclass
+        LOOP
+            EXECUTE 'ALTER INDEX ' || quote_ident(r.relname)
+                || ' RENAME TO ' || quote_ident(r.relname || '_legacy');
+        END LOOP;
+    END $$
+    """,
+    "CREATE TABLE posts (LIKE posts_legacy INCLUDING DEFAULTS INCLUDING GENERATED)"
+    " PARTITION BY RANGE (created_at)",
+    """
+    DO $$
+    BEGIN
+        EXECUTE 'ALTER SEQUENCE ' || pg_get_serial_sequence('posts_legacy', 'id')
+            || ' OWNED BY posts.id';
+    END $$
+    """,
+    "ALTER TABLE posts ADD PRIMARY KEY (id, created_at)",
+    "ALTER TABLE posts ADD CONSTRAINT posts_author_id_fkey"
+    " FOREIGN KEY (author_id) REFERENCES users (id) ON DELETE CASCADE",
+]
+
+
+def month_start(moment: datetime) -> datetime:
+    """Начало месяца в UTC."""
+    moment = moment.astimezone(timezone.utc)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """Сдвинуть начало месяца на months месяцев."""
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"posts_p{start:%Y_%m}"
+
+
+def parse_upper_bound(bound: str) -> datetime | None:
+    """Верхняя граница из pg_get_expr(relpartbound), None для MAXVALUE."""
+    match = UPPER_BOUND.search(bound)
+    return datetime.fromisoformat(match.group(1)) if match else None
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    relkind = await conn.scalar(
+        text("SELECT relkind FROM pg_class WHERE oid = 'posts'::regclass")
+    )
+    return relkind == "p"
+
+
+async def partition_bounds(conn: AsyncConnection) -> list[tuple[str, datetime | None]]:
+    """Секции posts и их верхние границы."""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)"
+            " FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+            " WHERE i.inhparent = 'posts'::regclass"
+        )
+    )
+    return [(name, parse_upper_bound(bound)) for name, bound in result.tuples()]
+
+
+async def convert_to_partitioned(conn: AsyncConnection) -> None:
+    """Превратить обычную posts в секционированную.
+
+    Все существующие строки остаются в секции posts_legacy до конца
+    текущего месяца. Индексы и триггеры счетчиков затем создает
+    upgrade_schema уже на секционированной таблице, подхватывая
+    одинаковые индексы posts_legacy.
+    """
+    for statement in CONVERT_STEPS:
+        await conn.exec_driver_sql(statement)
+    boundary = add_months(month_start(datetime.now(timezone.utc)), 1)
+    await conn.exec_driver_sql(
+        "ALTER TABLE posts ATTACH PARTITION posts_legacy"
+        f" FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+    )
+    await upgrade_schema(conn)
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int) -> list[str]:
+    """Создать секции с конца последней существующей до months_ahead вперед."""
+    current = month_start(datetime.now(timezone.utc))
+    uppers = [upper for _, upper in await partition_bounds(conn) if upper]
+    start = month_start(max(uppers)) if uppers else current
+    end = add_months(current, months_ahead + 1)
+    created = []
+    while start < end:
+        following = add_months(start, 1)
+        name = partition_name(start)
+        await conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF posts"
+            f" FOR VALUES FROM ('{start.isoformat()}') TO ('{following.isoformat()}')"
+        )
+        created.append(name)
+        start = following
+    return created
+
+
+async def partition_posts(conn: AsyncConnection) -> None:
+    """Включить секционирование, если нужно, и создать секции наперед."""
+    if not await is_partitioned(conn):
+        await convert_to_partitioned(conn)
+    await ensure_partitions(conn, settings.POSTS_PARTITION_MONTHS_AHEAD)
+
+
+async def archive_partitions(
+    conn: AsyncConnection, retention_months: int, move: bool = False
+) -> list[str]:
+    """Отсоединить секции, целиком старше retention_months месяцев.
+
+    Отсоединенная секция остается отдельной таблицей с тем же именем,
+    а с move=True ее строки переносятся в posts_archive и она удаляется.
+    Счетчики user_post_stats уменьшаются на архивированные посты.
+    """
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -retention_months)
+    archived = []
+    for name, upper in await partition_bounds(conn):
+        if upper is None or upper > cutoff:
+            continue
+        # DETACH держит ACCESS EXCLUSIVE на секции до конца транзакции, а
+        # ее строки больше не видны через posts, поэтому посчитанное после
+        # него уже не изменится.
+        await conn.exec_driver_sql(f"ALTER TABLE posts DETACH PARTITION {name}")
+        await conn.exec_driver_sql(
+            "UPDATE user_post_stats AS s"
+            " SET total = s.total - d.total, completed = s.completed - d.completed,"
+            " revision = s.revision + 1"
+            " FROM (SELECT author_id, count(*) AS total,"
+            " count(*) FILTER (WHERE completed) AS completed"
+            f" FROM {name} GROUP BY author_id) AS d"
+            " WHERE s.user_id = d.author_id"
+        )
+        if move:
+            await conn.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE}"
+                f" (LIKE {name} INCLUDING DEFAULTS)"
+            )
+            await conn.exec_driver_sql(
+                f"INSERT INTO {ARCHIVE_TABLE} SELECT * FROM {name}"
+            )
+            await conn.exec_driver_sql(f"DROP TABLE {name}")
+        archived.append(name)
+    return archived
+
+
+async def main(args: argparse.Namespace) -> None:
+    from src.core.database import engine
+
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_KEY})"
+        )
+        if not await is_partitioned(conn):
+            raise SystemExit("posts is not partitioned, set POSTS_PARTITIONED=true")
+        if args.command == "ensure":
+            names = await ensure_partitions(conn, args.months_ahead)
+        else:
+            names = await archive_partitions(conn, args.retention_months, args.move)
+    await engine.dispose()
+    for name in names:
+        print(name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="создать секции наперед")
+    ensure.add_argument(
+        "--months-ahead", type=int, default=settings.POSTS_PARTITION_MONTHS_AHEAD
+    )
+    archive = commands.add_parser("archive", help="отсоединить старые секции")
+    archive.add_argument(
+        "--retention-months", type=int, default=settings.POSTS_RETENTION_MONTHS
+    )
+    archive.add_argument(
+        "--move", action="store_true", help=f"перенести строки в {ARCHIVE_TABLE}"
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlmodel import delete
+
+from src.core.config import settings
+from src.core.database import async_session
+from src.models import Users
+
+logger = logging.getLogger(__name__)
+
+# Удаление порции постов по индексу (author_id, created_at, id).
+DELETE_POSTS_CHUNK = text(
+    "DELETE FROM posts WHERE id = ANY(ARRAY("
+    "SELECT id FROM posts WHERE author_id = :user_id LIMIT :limit))"
+)
+
+
+class UserPurger:
+    """Фоновое удаление пользователей с большим числом постов.
+
+    Посты удаляются порциями по USER_DELETE_CHUNK_SIZE, каждая в своей
+    транзакции, чтобы не держать долгих блокировок и не раздувать WAL
+    одной транзакцией. Затем удаляется сам пользователь. Если процесс
+    остановится посреди удаления, пользователь останется неактивным, и
+    повторный DELETE продолжит с того же места. Ошибка БД посреди
+    удаления пишется в лог, и удаление повторяется через retry_seconds.
+    """
+
+    def __init__(self, retry_seconds: float = 5.0) -> None:
+        self.retry_seconds = retry_seconds
+        self.failures = 0
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+
+    def is_running(self, user_id: int) -> bool:
+        return user_id in self._tasks
+
+    def start(self, user_id: int) -> None:
+        """Запустить удаление, если оно еще не идет."""
+        if user_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(user_id))
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+
+    async def _run(self, user_id: int) -> None:
+        """Удалять, пока не получится. Отмена прерывает повторы."""
+        while True:
+            try:
+                await self._purge(user_id)
+                return
+            except Exception:
+                self.failures += 1
+                logger.exception(
+                    "Purge of user %s failed, retrying in %s s",
+                    user_id,
+                    self.retry_seconds,
+                )
+                await asyncio.sleep(self.retry_seconds)
+
+    async def _purge(self, user_id: int) -> None:
+        while True:
+            async with async_session() as session:
+                result = await session.execute(
+                    DELETE_POSTS_CHUNK,
+                    {"user_id": user_id, "limit": settings.USER_DELETE_CHUNK_SIZE},
+                )
+                await session.commit()
+            if result.rowcount < settings.USER_DELETE_CHUNK_SIZE:  # type: ignore
+                break
+        async with async_session() as session:
+            await session.execute(delete(Users).where(Users.id == user_id))
+            await session.commit()
+
+    async def wait(self) -> None:
+        """Дождаться всех запущенных удалений."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Прервать удаления при остановке приложения."""
+        for task in self._tasks.values():
+            task.cancel()
+        await self.wait()
+
+
+user_purger = UserPurger()
@@ -0,0 +1,43 @@
+import time
+
+from src.core.cache import TTLCache
+
+
+class RateLimiter:
+    """Token bucket на ключ: burst запросов сразу, дальше per_minute в минуту.
+
+    Корзины лежат в LRU на maxsize ключей. Запись живет, пока корзина не
+    наполнится снова, поэтому устаревшая или вытесненная корзина равна
+    полной. Состояние в памяти воркера: при N воркерах общий лимит в N
+    раз больше. per_minute <= 0 отключает ограничение.
+    """
+
+    def __init__(self, per_minute: float, burst: int, maxsize: int):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.rejected = 0
+        # Ключ -> (токенов осталось, время последнего списания).
+        self._buckets: TTLCache[str, tuple[float, float]] = TTLCache(maxsize, ttl=0)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str) -> float:
+        """Списать токен. Вернуть 0 или сколько секунд ждать следующего."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.time()
+        tokens, updated = self._buckets.get(key) or (float(self.burst), now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self.rejected += 1
+            return (1 - tokens) / self.rate
+        tokens -= 1
+        refilled_at = now + (self.burst - tokens) / self.rate
+        self._buckets.set(key, (tokens, now), refilled_at)
+        return 0.0
+
+    def clear(self) -> None:
+        """Сбросить все корзины и счетчик отказов."""
+        self._buckets.clear()
+        self.rejected = 0
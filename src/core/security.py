@@ -1,7 +1,30 @@
+import asyncio
+import os
+import weakref
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from fastapi.exceptions import HTTPException
 from passlib.context import CryptContext
 
+from src.core.config import settings
+
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
+_executor: Executor | None = None
+_pending = 0
+
+# Паролей в одной задаче пула при массовом хешировании: задача должна
+# быть короткой, чтобы логины не ждали ее долго.
+HASH_BATCH_SIZE = 8
+# Общий на все импорты лимит одновременных задач массового хеширования.
+# Семафор привязывается к event loop, поэтому у каждого цикла свой.
+_batch_slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]
+_batch_slots = weakref.WeakKeyDictionary()
+
 
 def hash_password(password: str) -> str:
     """Захешировать пароль."""
@@ -12,3 +35,104 @@ def verify_password(password: str, hashed: str) -> bool:
     """Верифицировать пароль."""
     return password_context.verify(password, hashed)
 
+
+def get_hash_executor() -> Executor:
+    """Вернуть пул для bcrypt, создав его при первом обращении.
+
+    Тип пула (thread/process) и число воркеров задаются в .env.
+    """
+    global _executor
+    if _executor is None:
+        if settings.HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=settings.HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.HASH_WORKERS, thread_name_prefix="bcrypt"
+            )
+    return _executor
+
+
+def shutdown_hash_executor() -> None:
+    """Остановить пул хеширования."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _batch_slots.clear()
+
+
+def get_batch_slots() -> asyncio.Semaphore:
+    """Лимит задач массового хеширования для текущего event loop.
+
+    Половина воркеров пула, но не меньше одного.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _batch_slots.get(loop)
+    if slots is None:
+        workers = settings.HASH_WORKERS or os.cpu_count() or 1
+        slots = _batch_slots[loop] = asyncio.Semaphore(max(1, workers // 2))
+    return slots
+
+
+async def submit_to_hash_pool(func: Callable[..., T], *args: Any) -> T:
+    """Выполнить функцию в пуле хеширования, учитывая ее в очереди."""
+    global _pending
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+
+async def run_in_hash_pool(func: Callable[..., T], *args: str) -> T:
+    """Выполнить функцию в пуле хеширования, не блокируя event loop.
+
+    Если в очереди уже HASH_QUEUE_LIMIT задач, запрос отклоняется сразу
+    с 429, а не копит задержку для всех остальных.
+    """
+    if _pending >= settings.HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=429,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+    return await submit_to_hash_pool(func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    """Захешировать пароль в пуле воркеров."""
+    return await run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """Верифицировать пароль в пуле воркеров."""
+    return await run_in_hash_pool(verify_password, password, hashed)
+
+
+def hash_passwords(passwords: Sequence[str]) -> list[str]:
+    """Захешировать несколько паролей подряд."""
+    return [password_context.hash(password) for password in passwords]
+
+
+async def hash_passwords_async(passwords: Sequence[str]) -> list[str]:
+    """Захешировать пачку паролей для массового импорта.
+
+    Пароли уходят в пул задачами по HASH_BATCH_SIZE, и одновременно
+    заняты не больше половины воркеров, поэтому логины не встают в
+    очередь за всем импортом. Задачи импорта учитываются в
+    HASH_QUEUE_LIMIT, но сами не отклоняются: импорт просто ждет.
+    """
+    slots = get_batch_slots()
+
+    async def hash_batch(batch: Sequence[str]) -> list[str]:
+        async with slots:
+            return await submit_to_hash_pool(hash_passwords, batch)
+
+    parts = await asyncio.gather(
+        *(
+            hash_batch(passwords[start : start + HASH_BATCH_SIZE])
+            for start in range(0, len(passwords), HASH_BATCH_SIZE)
+        )
+    )
+    return [hashed for part in parts for hashed in part]
@@ -2,16 +2,30 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from src.api.metrics import MetricsMiddleware
+from src.api.metrics import router as metrics_router
 from src.api.routers.admin import router as admin_router
 from src.api.routers.posts import router as posts_router
 from src.api.routers.users import router as users_router
-from src.core.database import init_db
+from src.api.warmup import router as warmup_router
+from src.api.warmup import warmup
+from src.core.coalescer import post_coalescer
+from src.core.config import settings
+from src.core.database import dispose_engines, init_db
+from src.core.purge import user_purger
+from src.core.security import shutdown_hash_executor
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    warmup.start()
     yield
+    await warmup.stop()
+    await post_coalescer.stop()
+    await user_purger.stop()
+    shutdown_hash_executor()
+    await dispose_engines()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -19,6 +33,11 @@ app = FastAPI(lifespan=lifespan)
 app.include_router(users_router, prefix="/api/v1")
 app.include_router(posts_router, prefix="/api/v1")
 app.include_router(admin_router, prefix="/api/v1")
+app.include_router(warmup_router)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
 
 if __name__ == "__main__":
     import uvicorn
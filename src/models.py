@@ -1,16 +1,32 @@
 from datetime import datetime
 from typing import List, Optional
 
-from sqlmodel import Column, Field, Relationship, SQLModel, String, text  # type: ignore
+from sqlmodel import (  # type: ignore
+    Column,
+    DateTime,
+    Field,
+    Index,
+    Relationship,
+    SQLModel,
+    func,
+    text,
+)
 
 
 class TokenResponse(SQLModel):
     """Схема возврата токена."""
 
     access_token: str = Field(description="JWT токен.")
+    refresh_token: str = Field(description="JWT токен для получения новой пары.")
     token_type: str = Field(description="Тип токена.")
 
 
+class RefreshRequest(SQLModel):
+    """Схема запроса обновления токенов."""
+
+    refresh_token: str = Field(description="Refresh токен из ответа /login.")
+
+
 class User(SQLModel):
     """Базовая схема пользователя."""
 
@@ -54,7 +70,7 @@ class Users(User, table=True):
     """ORM модель БД со всей информацией пользователя."""
 
     id: int = Field(default=None, primary_key=True)
-    username: str
+    username: str = Field(index=True, unique=True)
     password: str
     is_active: bool = Field(default=True)
     superuser: bool = Field(default=False)
@@ -76,6 +92,42 @@ class PostCompleted(SQLModel):
     completed: bool = Field(description="Считается ли пост выполенным.")
 
 
+class PostCompletedBatchItem(PostCompleted):
+    """Схема элемента пакетного обновления поля completed."""
+
+    id: int = Field(description="ID поста.")
+
+
+class PostIds(SQLModel):
+    """Схема списка ID постов."""
+
+    ids: list[int] = Field(description="ID постов.")
+
+
+class BatchItemResult(SQLModel):
+    """Схема результата пакетной операции над одним постом."""
+
+    id: int = Field(description="ID поста.")
+    status: int = Field(description="HTTP статус операции над этим постом.")
+    detail: str | None = Field(default=None, description="Причина ошибки.")
+
+
+class UserImportRow(User):
+    """Схема строки CSV импорта пользователей."""
+
+    password: str = Field(min_length=6, max_length=32)
+
+
+class UserImportResult(SQLModel):
+    """Схема результата импорта одной строки CSV."""
+
+    line: int = Field(description="Номер строки в CSV, считая заголовок.")
+    username: str = Field(description="Имя аккаунта из строки.")
+    status: int = Field(description="201 - создан, 409 - имя занято, 422 - ошибка.")
+    id: int | None = Field(default=None, description="ID созданного пользователя.")
+    detail: str | None = Field(default=None, description="Причина отказа.")
+
+
 class PostResponse(Post):
     """Схема информации о посте."""
 
@@ -96,10 +148,54 @@ class PostResponseAdmin(Post):
 class Posts(Post, table=True):
     """ORM модель БД со всей информацией о постах."""
 
+    __table_args__ = (
+        Index("ix_posts_author_created_id", "author_id", "created_at", "id"),
+        Index("ix_posts_created_id", "created_at", "id"),
+        Index("ix_posts_author_updated", "author_id", "updated_at"),
+        # Список незавершенных постов автора читает только их.
+        Index(
+            "ix_posts_author_open",
+            "author_id",
+            "created_at",
+            "id",
+            postgresql_where=text("NOT completed"),
+        ),
+    )
+
     id: int = Field(default=None, primary_key=True)
     created_at: datetime = Field(
-        sa_column=Column(String, server_default=text("TIMEZONE('utc', NOW())"))
+        sa_column=Column(
+            DateTime(timezone=True), server_default=func.now(), nullable=False
+        )
     )
-    author_id: int = Field(foreign_key="users.id")
+    # Отдельный индекс по author_id не нужен: его покрывает ix_posts_author_created_id.
+    author_id: int = Field(foreign_key="users.id", ondelete="CASCADE")
     completed: bool = False
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
+    updated_at: datetime = Field(
+        sa_column=Column(
+            DateTime(timezone=True), server_default=func.now(), nullable=False
+        )
+    )
     author: Optional["Users"] = Relationship(back_populates="posts")
+
+
+class PostStats(SQLModel):
+    """Схема статистики постов пользователя."""
+
+    total: int = Field(default=0, description="Всего постов.")
+    completed: int = Field(default=0, description="Из них выполненных.")
+
+
+class UserPostStats(PostStats, table=True):
+    """Счетчики постов пользователя.
+
+    Поддерживаются триггерами на posts (src/core/migrations.py), поэтому
+    чтение не зависит от числа постов.
+    """
+
+    __tablename__ = "user_post_stats"  # type: ignore
+
+    user_id: int = Field(foreign_key="users.id", primary_key=True, ondelete="CASCADE")
+    # Номер изменения постов пользователя, для ETag списка.
+    revision: int = Field(default=0, sa_column_kwargs={"server_default": text("0")})
@@ -1,14 +1,25 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Generator
+from typing import Any
 
+import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy import event
 
+from src.api.deps import client_limiter, login_limiter
 from src.core.config import settings
+from src.core.database import engine
 from src.main import app
 
 ADMIN_PASS = settings.ADMIN_PASS
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limits() -> None:
+    login_limiter.clear()
+    client_limiter.clear()
+
+
 @pytest_asyncio.fixture(scope="session")
 async def client() -> AsyncGenerator[AsyncClient, None]:
     async with AsyncClient(
@@ -75,3 +86,15 @@ async def created_user_post(
     post_id = response.json()["id"]
     yield response
     await client.delete(f"/api/v1/posts/{post_id}", headers=user_token)
+
+
+@pytest.fixture(scope="function")
+def sql_statements() -> Generator[list[str], None, None]:
+    statements: list[str] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        statements.append(args[2])
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
@@ -1,5 +1,15 @@
+import asyncio
+import resource
+from typing import Any
+
 import pytest
 from httpx import AsyncClient, Response
+from sqlalchemy import text
+
+from src.core.config import settings
+from src.core.database import async_session
+from src.core.purge import UserPurger, user_purger
+from src.main import app
 
 
 @pytest.mark.asyncio
@@ -163,3 +173,280 @@ async def test_delete_user_by_admin(
 
     response = await client.request("DELETE", "/api/v1/admin/Luna", headers=admin_token)
     assert response.status_code == 204
+
+
+EXPORT_ROWS = 1_000_000
+
+
+def current_rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+
+
+async def export_through_asgi(
+    path: str, query: str, headers: dict[str, str]
+) -> tuple[int, int, int]:
+    """Прогнать запрос через приложение, не накапливая тело ответа.
+
+    ASGITransport из httpx собирает тело целиком, что исказило бы замер памяти.
+    """
+    finished = asyncio.Event()
+    status = 0
+    lines = 0
+    peak_growth = 0
+    baseline = current_rss()
+
+    async def receive() -> dict[str, Any]:
+        if not finished.is_set():
+            finished.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status, lines, peak_growth
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            lines += message.get("body", b"").count(b"\n")
+            peak_growth = max(peak_growth, current_rss() - baseline)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    return status, lines, peak_growth
+
+
+@pytest.mark.asyncio
+async def test_export_posts(
+    client: AsyncClient,
+    created_user: Response,
+    admin_token: dict[str, str],
+    user_token: dict[str, str],
+):
+    author_id = created_user.json()["id"]
+    async with async_session() as session:
+        await session.execute(
+            text(
+                "INSERT INTO posts (text, author_id, completed)"
+                " SELECT 'Exported post ' || n, :author_id, n % 2 = 0"
+                " FROM generate_series(1, :rows) AS n"
+            ),
+            {"author_id": author_id, "rows": EXPORT_ROWS},
+        )
+        await session.commit()
+
+    try:
+        response = await client.get("/api/v1/admin/posts/export", headers=user_token)
+        assert response.status_code == 403
+
+        # Замер памяти первым: ASGITransport ниже собирает тело ответа
+        # целиком и раздул бы базовый RSS.
+        status, lines, peak_growth = await export_through_asgi(
+            "/api/v1/admin/posts/export",
+            f"format=ndjson&author_id={author_id}",
+            admin_token,
+        )
+        assert status == 200
+        assert lines == EXPORT_ROWS
+        assert peak_growth < 64 * 1024 * 1024
+
+        response = await client.get(
+            "/api/v1/admin/posts/export",
+            params={"format": "csv", "author_id": author_id},
+            headers=admin_token,
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        header, first = response.text.splitlines()[:2]
+        assert header == "id,text,created_at,author_id,completed"
+        assert f",{author_id}," in first
+
+        # Все строки вставлены одним INSERT и имеют одинаковый created_at,
+        # а created_after, как и у списков постов, исключает границу.
+        # Пустая выгрузка все равно начинается с заголовка.
+        created_at = first.split(",")[2]
+        response = await client.get(
+            "/api/v1/admin/posts/export",
+            params={
+                "format": "csv",
+                "author_id": author_id,
+                "created_after": created_at,
+            },
+            headers=admin_token,
+        )
+        assert response.status_code == 200
+        assert response.text.splitlines() == [header]
+    finally:
+        async with async_session() as session:
+            await session.execute(
+                text("DELETE FROM posts WHERE author_id = :author_id"),
+                {"author_id": author_id},
+            )
+            await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats(
+    client: AsyncClient, admin_token: dict[str, str], user_token: dict[str, str]
+):
+    response = await client.get("/api/v1/admin/stats/pool", headers=user_token)
+    assert response.status_code == 403
+
+    response = await client.get("/api/v1/admin/stats/pool", headers=admin_token)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["checkouts"] > 0
+    assert data["timeouts"] == 0
+    assert data["wait_seconds"]["count"] > 0
+    assert data["wait_seconds"]["buckets"]["+Inf"] == data["wait_seconds"]["count"]
+
+
+@pytest.mark.asyncio
+async def test_import_users(client: AsyncClient, admin_token: dict[str, str]):
+    rows = [
+        "username,password",
+        "Importer1,secret-one",
+        "Aurora,secret-two",
+        "Importer2,secret-three",
+        "Importer1,secret-four",
+        "Importer3,short",
+        "Importer4",
+    ]
+
+    async def body():
+        for row in rows:
+            yield (row + "\r\n").encode()
+
+    response = await client.post(
+        "/api/v1/admin/users/import",
+        content=body(),
+        headers={**admin_token, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert [(item["line"], item["status"]) for item in report] == [
+        (2, 201),
+        (3, 409),
+        (4, 201),
+        (5, 422),
+        (6, 422),
+        (7, 422),
+    ]
+    assert report[0]["id"] is not None
+    assert report[3]["detail"] == "Duplicate username in file"
+
+    response = await client.post(
+        "/api/v1/users/login",
+        data={"username": "Importer2", "password": "secret-three"},
+    )
+    assert response.status_code == 200
+
+    response = await client.post(
+        "/api/v1/admin/users/import",
+        content=b"login,secret\nImporter5,secret-five\n",
+        headers=admin_token,
+    )
+    assert response.status_code == 400
+
+    for username in ("Importer1", "Importer2"):
+        await client.delete(f"/api/v1/admin/{username}", headers=admin_token)
+
+
+async def count_posts(author_id: int) -> int:
+    async with async_session() as session:
+        result = await session.execute(
+            text("SELECT count(*) FROM posts WHERE author_id = :author_id"),
+            {"author_id": author_id},
+        )
+        return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_delete_user_cascades_posts(
+    client: AsyncClient, created_user: Response, admin_token: dict[str, str]
+):
+    author_id = created_user.json()["id"]
+    response = await client.post(
+        "/api/v1/users/login", data={"username": "Luna", "password": "vulpkanin"}
+    )
+    luna_token = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await client.post(
+        "/api/v1/posts/batch",
+        json=[{"text": f"Luna post {number}"} for number in range(5)],
+        headers=luna_token,
+    )
+    assert await count_posts(author_id) == 5
+
+    response = await client.delete("/api/v1/admin/Luna", headers=admin_token)
+    assert response.status_code == 204
+    assert await count_posts(author_id) == 0
+
+
+DELETED_USER_ROWS = 1_000_000
+
+
+@pytest.mark.asyncio
+async def test_delete_user_with_many_posts(
+    client: AsyncClient, created_user: Response, admin_token: dict[str, str]
+):
+    author_id = created_user.json()["id"]
+    async with async_session() as session:
+        await session.execute(
+            text(
+                "INSERT INTO posts (text, author_id)"
+                " SELECT 'Doomed post ' || n, :author_id"
+                " FROM generate_series(1, :rows) AS n"
+            ),
+            {"author_id": author_id, "rows": DELETED_USER_ROWS},
+        )
+        await session.commit()
+    assert DELETED_USER_ROWS > settings.USER_DELETE_SYNC_LIMIT
+
+    response = await client.delete("/api/v1/admin/Luna", headers=admin_token)
+    assert response.status_code == 202
+    # Пользователь сразу не может войти, хотя посты еще удаляются.
+    response = await client.post(
+        "/api/v1/users/login", data={"username": "Luna", "password": "vulpkanin"}
+    )
+    assert response.status_code == 401
+
+    await user_purger.wait()
+    assert await count_posts(author_id) == 0
+    response = await client.get("/api/v1/admin/username/Luna", headers=admin_token)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_purge_retries_after_error(monkeypatch: pytest.MonkeyPatch):
+    purger = UserPurger(retry_seconds=0)
+    calls: list[int] = []
+
+    async def flaky_purge(user_id: int) -> None:
+        calls.append(user_id)
+        if len(calls) == 1:
+            raise OSError("connection lost")
+
+    monkeypatch.setattr(purger, "_purge", flaky_purge)
+    purger.start(7)
+    await purger.wait()
+    assert calls == [7, 7]
+    assert purger.failures == 1
+    assert not purger.is_running(7)
+
+
+def test_delete_user_documents_202():
+    responses = app.openapi()["paths"]["/api/v1/admin/{username}"]["delete"]
+    assert {"202", "204"} <= set(responses["responses"])
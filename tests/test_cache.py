@@ -0,0 +1,64 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from src.api.deps import ALGORITHM, SECRET_KEY, decode_token, token_cache
+from src.core.auth import create_tokens
+from src.core.cache import PrincipalCache, TTLCache
+from src.models import Users
+
+
+def test_ttl_cache_lru_and_expiry():
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.set("d", 4, expires_at=time.time() - 1)
+    assert cache.get("d") is None
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 2}
+
+
+def test_principal_cache_invalidate():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    user = Users(id=1, username="Luna", password="hash", token_version=3)
+    cache.set_user(3, user)
+    cache.set_user(2, user)
+    cached = cache.get_user("Luna", 3)
+    assert cached is not None
+    assert cached.id == 1
+    assert cached.token_version == 3
+    cache.invalidate("Luna")
+    assert cache.get_user("Luna", 3) is None
+    assert cache.get_user("Luna", 2) is None
+    assert len(cache) == 0
+
+
+def test_token_cache():
+    token_cache.clear()
+    tokens = create_tokens(Users(username="Luna", password="hash", token_version=3))
+    access = tokens["access_token"]
+    assert decode_token(access) == ("Luna", 3)
+    assert decode_token(access) == ("Luna", 3)
+    assert token_cache.hits == 1
+    # Кешированный access токен все равно не годится как refresh.
+    with pytest.raises(HTTPException):
+        decode_token(access, refresh=True)
+
+    for token in ("broken", access[:-2] + "xx"):
+        for _ in range(2):
+            with pytest.raises(HTTPException) as error:
+                decode_token(token)
+            assert error.value.status_code == 401
+    assert len(token_cache) == 1
+
+    expired = jwt.encode(
+        {"sub": "Luna", "ver": 3, "exp": int(time.time()) - 1}, SECRET_KEY, ALGORITHM
+    )
+    token_cache.set((expired, False), ("Luna", 3), expires_at=time.time() - 1)
+    with pytest.raises(HTTPException):
+        decode_token(expired)
@@ -0,0 +1,47 @@
+import re
+
+import pytest
+from httpx import AsyncClient, Response
+
+
+def sample(text: str, name: str, **labels: str) -> float:
+    """Найти значение метрики с указанными метками."""
+    for line in text.splitlines():
+        if not line.startswith(name + "{"):
+            continue
+        if all(f'{key}="{value}"' in line for key, value in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} {labels} not found")
+
+
+@pytest.mark.asyncio
+async def test_metrics(
+    client: AsyncClient, created_user_post: Response, user_token: dict[str, str]
+):
+    post_id = created_user_post.json()["id"]
+    for _ in range(3):
+        response = await client.get(f"/api/v1/posts/{post_id}", headers=user_token)
+        assert response.status_code == 200
+    await client.get("/api/v1/no/such/path/42")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+
+    route = "/api/v1/posts/{post_id}"
+    assert (
+        sample(text, "http_requests_total", method="GET", route=route, status="200")
+        >= 3
+    )
+    assert str(post_id) not in re.findall(r'route="([^"]*)"', text)
+    assert sample(text, "http_requests_total", route="<unmatched>", status="404") >= 1
+
+    # Каждый запрос поста ходит в БД хотя бы раз.
+    count = sample(text, "http_request_db_queries_count", method="GET", route=route)
+    queries = sample(text, "http_request_db_queries_sum", method="GET", route=route)
+    assert count >= 3
+    assert queries >= count
+    assert sample(text, "http_request_db_seconds_sum", method="GET", route=route) > 0
+    assert 'db_query_duration_seconds_bucket{le="+Inf"}' in text
+    assert "db_pool_checkouts_total" in text
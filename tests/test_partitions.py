@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlmodel import SQLModel, select
+
+from src.api.pagination import PostFilters, fetch_posts_page
+from src.api.stats import get_post_stats
+from src.core import partitions
+from src.core.database import engine
+from src.core.migrations import upgrade_schema
+from src.core.partitions import (
+    add_months,
+    archive_partitions,
+    is_partitioned,
+    month_start,
+    parse_upper_bound,
+    partition_bounds,
+    partition_name,
+    partition_posts,
+)
+from src.models import Posts
+from tests.test_schema import plan_nodes
+
+
+def test_month_math():
+    moscow = timezone(timedelta(hours=3))
+    start = month_start(datetime(2026, 1, 1, 1, 30, tzinfo=moscow))
+    assert start == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert add_months(start, 1) == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert add_months(start, -12) == datetime(2024, 12, 1, tzinfo=timezone.utc)
+    assert partition_name(add_months(start, 3)) == "posts_p2026_03"
+
+
+def test_parse_upper_bound():
+    bound = "FOR VALUES FROM (MINVALUE) TO ('2026-11-01 03:00:00+03')"
+    upper = parse_upper_bound(bound)
+    assert upper == datetime(2026, 11, 1, tzinfo=timezone.utc)
+    assert month_start(upper) == upper
+    assert parse_upper_bound("FOR VALUES FROM ('2026-11-01') TO (MAXVALUE)") is None
+
+
+class Later(datetime):
+    """Начало месяца, наступающего через months месяцев, для архивации."""
+
+    months = 0
+
+    @classmethod
+    def now(cls, tz: Any = None) -> "Later":
+        moment = add_months(month_start(datetime.now(timezone.utc)), cls.months)
+        return cls(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+async def relations(conn: AsyncConnection, sql: str) -> set[str]:
+    result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar_one()[0]["Plan"]
+    return {
+        node["Relation Name"] for node in plan_nodes(plan) if "Relation Name" in node
+    }
+
+
+async def read_revision(conn: AsyncConnection, author_id: int) -> int:
+    return await conn.scalar(
+        text("SELECT revision FROM user_post_stats WHERE user_id = :id"),
+        {"id": author_id},
+    )
+
+
+async def read_stats(conn: AsyncConnection, author_id: int) -> tuple[int, int]:
+    async with AsyncSession(bind=conn) as session:
+        stats = await get_post_stats(session, author_id)
+    return stats.total, stats.completed
+
+
+@pytest.mark.asyncio
+async def test_partition_posts(monkeypatch: pytest.MonkeyPatch):
+    now = datetime.now(timezone.utc)
+    current = month_start(now)
+    # Вся проверка идет в отдельной схеме в одной транзакции, которая
+    # откатывается: DDL в PostgreSQL транзакционный.
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("CREATE SCHEMA partition_test")
+        await conn.exec_driver_sql("SET LOCAL search_path TO partition_test")
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await upgrade_schema(conn)
+        author_id = await conn.scalar(
+            text(
+                "INSERT INTO users (username, password, is_active, superuser,"
+                " token_version) VALUES ('Luna', 'hash', true, false, 0) RETURNING id"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO posts (text, author_id, completed, created_at)"
+                " SELECT 'Old post ' || n, :author_id, n % 2 = 0,"
+                " now() - make_interval(months => n)"
+                " FROM generate_series(0, 29) AS n"
+            ),
+            {"author_id": author_id},
+        )
+
+        revision = await read_revision(conn, author_id)
+        await partition_posts(conn)
+        assert await is_partitioned(conn)
+        # Пересчет счетчиков при переустановке триггеров не сбрасывает revision.
+        assert await read_revision(conn, author_id) > revision
+        names = {name for name, _ in await partition_bounds(conn)}
+        assert "posts_legacy" in names
+        assert partition_name(add_months(current, 3)) in names
+
+        assert await read_stats(conn, author_id) == (30, 15)
+        session = AsyncSession(bind=conn)
+        stmt = select(Posts).where(Posts.author_id == author_id)
+        page = await fetch_posts_page(session, stmt, Response(), None, 10, order="desc")
+        assert [post.text for post in page[:2]] == ["Old post 0", "Old post 1"]
+
+        # Новый пост попадает в секцию следующего месяца.
+        following = add_months(current, 1)
+        await conn.execute(
+            text(
+                "INSERT INTO posts (text, author_id, completed, created_at)"
+                " VALUES ('Future post', :author_id, false, :created_at)"
+            ),
+            {"author_id": author_id, "created_at": following},
+        )
+        assert await read_stats(conn, author_id) == (31, 15)
+        filters = PostFilters(created_after=following - timedelta(seconds=1))
+        page = await fetch_posts_page(
+            session, stmt.where(*filters.criteria()), Response(), None, 10
+        )
+        assert [post.text for post in page] == ["Future post"]
+
+        scanned = await relations(
+            conn,
+            f"SELECT id FROM posts WHERE created_at >= '{following.isoformat()}'"
+            f" AND created_at < '{add_months(following, 1).isoformat()}'",
+        )
+        assert scanned == {partition_name(following)}
+
+        # Через 25 месяцев старше 24 месяцев хранения только posts_legacy,
+        # еще через месяц - секция следующего месяца.
+        monkeypatch.setattr(partitions, "datetime", Later)
+        Later.months = 25
+        assert await archive_partitions(conn, 24) == ["posts_legacy"]
+        assert "posts_legacy" not in {name for name, _ in await partition_bounds(conn)}
+        assert await conn.scalar(text("SELECT count(*) FROM posts_legacy")) == 30
+        assert await conn.scalar(text("SELECT count(*) FROM posts")) == 1
+        assert await read_stats(conn, author_id) == (1, 0)
+
+        Later.months = 26
+        moved = await archive_partitions(conn, 24, move=True)
+        assert moved == [partition_name(following)]
+        assert await conn.scalar(text("SELECT count(*) FROM posts_archive")) == 1
+        assert await conn.scalar(text("SELECT count(*) FROM posts")) == 0
+        assert (
+            await conn.scalar(
+                text("SELECT to_regclass(:name)"), {"name": partition_name(following)}
+            )
+            is None
+        )
+
+        await session.close()
+        await conn.rollback()
@@ -1,5 +1,11 @@
+import asyncio
+
 import pytest
 from httpx import AsyncClient, Response
+from sqlalchemy.exc import IntegrityError
+
+from src.core.coalescer import InsertCoalescer, post_coalescer
+from src.core.config import settings
 
 
 @pytest.mark.asyncio
@@ -105,3 +111,474 @@ async def test_delete_post(
     assert response.status_code == 204
     response = await client.delete(f"/api/v1/posts/{post_id}", headers=admin_token)
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_read_users_posts_cursor(client: AsyncClient, user_token: dict[str, str]):
+    created_ids = []
+    for number in range(3):
+        response = await client.post(
+            "/api/v1/posts/", json={"text": f"Page post {number}"}, headers=user_token
+        )
+        created_ids.append(response.json()["id"])
+
+    seen: list[dict[str, str | int | bool]] = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = await client.get("/api/v1/posts/", params=params, headers=user_token)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": 2, "cursor": cursor}
+
+    ids = [post["id"] for post in seen]
+    assert len(ids) == len(set(ids))
+    assert set(created_ids) <= set(ids)
+    keys = [(post["created_at"], post["id"]) for post in seen]
+    assert keys == sorted(keys)
+
+    response = await client.get(
+        "/api/v1/posts/", params={"cursor": "broken"}, headers=user_token
+    )
+    assert response.status_code == 400
+
+    for post_id in created_ids:
+        await client.delete(f"/api/v1/posts/{post_id}", headers=user_token)
+
+
+def writes(statements: list[str]) -> list[str]:
+    return [
+        s for s in statements if s.lstrip().upper().startswith(("INSERT", "UPDATE"))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_writes_use_returning(
+    client: AsyncClient, user_token: dict[str, str], sql_statements: list[str]
+):
+    await client.get("/api/v1/posts/", headers=user_token)
+
+    sql_statements.clear()
+    response = await client.post(
+        "/api/v1/posts/", json={"text": "Returning"}, headers=user_token
+    )
+    assert response.status_code == 200
+    assert "created_at" in response.json()
+    assert len(sql_statements) == 1
+    assert "RETURNING" in sql_statements[0]
+    post_id = response.json()["id"]
+
+    for method, url, body in (
+        ("PUT", f"/api/v1/posts/{post_id}", {"text": "Returning again"}),
+        ("PATCH", f"/api/v1/posts/{post_id}/completed", {"completed": True}),
+    ):
+        sql_statements.clear()
+        response = await client.request(method, url, json=body, headers=user_token)
+        assert response.status_code == 200
+        assert writes(sql_statements) == sql_statements
+        assert len(sql_statements) == 1
+        assert "RETURNING" in sql_statements[0]
+
+    sql_statements.clear()
+    response = await client.delete(f"/api/v1/posts/{post_id}", headers=user_token)
+    assert response.status_code == 204
+    assert len(sql_statements) == 1
+    assert sql_statements[0].lstrip().upper().startswith("DELETE")
+
+
+@pytest.mark.asyncio
+async def test_posts_batch(
+    client: AsyncClient,
+    user_token: dict[str, str],
+    created_admin_post: Response,
+):
+    response = await client.post(
+        "/api/v1/posts/batch",
+        json=[{"text": f"Batch post {number}"} for number in range(3)],
+        headers=user_token,
+    )
+    assert response.status_code == 200
+    created = response.json()
+    assert [post["text"] for post in created] == [f"Batch post {n}" for n in range(3)]
+    ids = [post["id"] for post in created]
+    admin_post_id = created_admin_post.json()["id"]
+
+    response = await client.patch(
+        "/api/v1/posts/batch/completed",
+        json=[
+            {"id": ids[0], "completed": True},
+            {"id": ids[1], "completed": False},
+            {"id": admin_post_id, "completed": True},
+            {"id": 999999, "completed": True},
+        ],
+        headers=user_token,
+    )
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()] == [200, 200, 403, 404]
+    response = await client.get(f"/api/v1/posts/{ids[0]}", headers=user_token)
+    assert response.json()["completed"]
+
+    response = await client.patch(
+        "/api/v1/posts/batch/completed",
+        json=[
+            {"id": ids[0], "completed": False},
+            {"id": ids[1], "completed": True},
+            {"id": ids[0], "completed": True},
+        ],
+        headers=user_token,
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"] == f"Duplicate post ids in batch: {ids[0]}"
+    response = await client.get(f"/api/v1/posts/{ids[0]}", headers=user_token)
+    assert response.json()["completed"]
+
+    response = await client.request(
+        "DELETE",
+        "/api/v1/posts/batch",
+        json={"ids": ids + [admin_post_id]},
+        headers=user_token,
+    )
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()] == [200, 200, 200, 403]
+    response = await client.get(f"/api/v1/posts/{ids[0]}", headers=user_token)
+    assert response.status_code == 404
+
+    response = await client.post(
+        "/api/v1/posts/batch",
+        json=[{"text": "Too many"}] * (settings.BATCH_MAX_SIZE + 1),
+        headers=user_token,
+    )
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_search_posts(
+    client: AsyncClient, user_token: dict[str, str], admin_token: dict[str, str]
+):
+    response = await client.post(
+        "/api/v1/posts/batch",
+        json=[
+            {"text": "zebracorn once"},
+            {"text": "zebracorn zebracorn twice"},
+            {"text": "nothing to find here"},
+        ],
+        headers=user_token,
+    )
+    ids = [post["id"] for post in response.json()]
+    response = await client.post(
+        "/api/v1/posts/", json={"text": "admin zebracorn"}, headers=admin_token
+    )
+    admin_post_id = response.json()["id"]
+
+    response = await client.get(
+        "/api/v1/posts/search", params={"q": "zebracorn"}, headers=user_token
+    )
+    assert response.status_code == 200
+    assert [post["id"] for post in response.json()] == [ids[1], ids[0]]
+
+    response = await client.get(
+        "/api/v1/posts/search",
+        params={"q": "zebracorn", "limit": 1},
+        headers=user_token,
+    )
+    assert [post["id"] for post in response.json()] == [ids[1]]
+    response = await client.get(
+        "/api/v1/posts/search",
+        params={
+            "q": "zebracorn",
+            "limit": 1,
+            "cursor": response.headers["X-Next-Cursor"],
+        },
+        headers=user_token,
+    )
+    assert [post["id"] for post in response.json()] == [ids[0]]
+
+    response = await client.get(
+        "/api/v1/admin/posts/search", params={"q": "zebracorn"}, headers=admin_token
+    )
+    assert response.status_code == 200
+    assert {post["id"] for post in response.json()} == {ids[0], ids[1], admin_post_id}
+
+    await client.request(
+        "DELETE", "/api/v1/posts/batch", json={"ids": ids}, headers=user_token
+    )
+    await client.delete(f"/api/v1/posts/{admin_post_id}", headers=admin_token)
+
+
+@pytest.mark.asyncio
+async def test_search_posts_tied_rank(client: AsyncClient, user_token: dict[str, str]):
+    response = await client.post(
+        "/api/v1/posts/batch",
+        json=[{"text": "quokkaberry tied rank"}] * 7,
+        headers=user_token,
+    )
+    ids = [post["id"] for post in response.json()]
+
+    seen: list[int] = []
+    params: dict[str, str | int] = {"q": "quokkaberry", "limit": 3}
+    for _ in range(len(ids)):
+        response = await client.get(
+            "/api/v1/posts/search", params=params, headers=user_token
+        )
+        assert response.status_code == 200
+        seen += [post["id"] for post in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert seen == sorted(ids, reverse=True)
+
+    await client.request(
+        "DELETE", "/api/v1/posts/batch", json={"ids": ids}, headers=user_token
+    )
+
+
+@pytest.mark.asyncio
+async def test_conditional_get(
+    client: AsyncClient,
+    created_user_post: Response,
+    user_token: dict[str, str],
+    admin_token: dict[str, str],
+    sql_statements: list[str],
+):
+    post_id = created_user_post.json()["id"]
+    url = f"/api/v1/posts/{post_id}"
+    response = await client.get(url, headers=user_token)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    sql_statements.clear()
+    response = await client.get(url, headers={**user_token, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    # Для 304 читается только версия поста, без его текста.
+    assert not any("posts.text" in statement for statement in sql_statements)
+
+    await client.patch(f"{url}/completed", json={"completed": True}, headers=user_token)
+    response = await client.get(url, headers={**user_token, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    sql_statements.clear()
+    response = await client.get("/api/v1/posts/", headers=user_token)
+    list_etag = response.headers["ETag"]
+    # Валидатор списка читается из user_post_stats, без агрегата по постам.
+    assert not any("count(" in statement for statement in sql_statements)
+    response = await client.get(
+        "/api/v1/posts/", headers={**user_token, "If-None-Match": list_etag}
+    )
+    assert response.status_code == 304
+    await client.put(url, json={"text": "Changed for ETag"}, headers=user_token)
+    response = await client.get(
+        "/api/v1/posts/", headers={**user_token, "If-None-Match": list_etag}
+    )
+    assert response.status_code == 200
+
+    response = await client.get("/api/v1/admin/stats/conditional", headers=admin_token)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["read_selected_post"]["not_modified"] >= 1
+    assert 0 < stats["read_users_posts"]["ratio"] < 1
+
+
+@pytest.mark.asyncio
+async def test_fast_json_same_wire_format(
+    client: AsyncClient,
+    user_token: dict[str, str],
+    admin_token: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    response = await client.post(
+        "/api/v1/posts/batch",
+        json=[{"text": f'Быстрый пост "{number}"\n'} for number in range(3)],
+        headers=user_token,
+    )
+    created_ids = [post["id"] for post in response.json()]
+
+    for url, headers in (
+        ("/api/v1/posts/", user_token),
+        ("/api/v1/admin/posts", admin_token),
+    ):
+        params = {"limit": 2}
+        monkeypatch.setattr(settings, "FAST_JSON", False)
+        slow = await client.get(url, params=params, headers=headers)
+        monkeypatch.setattr(settings, "FAST_JSON", True)
+        fast = await client.get(url, params=params, headers=headers)
+        assert fast.status_code == slow.status_code == 200
+        assert fast.content == slow.content
+        assert fast.headers["content-type"] == slow.headers["content-type"]
+        assert fast.headers["X-Next-Cursor"] == slow.headers["X-Next-Cursor"]
+        assert fast.headers.get("ETag") == slow.headers.get("ETag")
+
+    await client.request(
+        "DELETE", "/api/v1/posts/batch", json={"ids": created_ids}, headers=user_token
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_post_coalescing(
+    client: AsyncClient,
+    user_token: dict[str, str],
+    admin_token: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(settings, "POST_COALESCE_ENABLED", True)
+    flushes = post_coalescer.flushes
+    texts = [f"Coalesced post {number}" for number in range(20)]
+    responses = await asyncio.gather(
+        *(
+            client.post("/api/v1/posts/", json={"text": text}, headers=user_token)
+            for text in texts
+        )
+    )
+    assert all(response.status_code == 200 for response in responses)
+    posts = [response.json() for response in responses]
+    assert [post["text"] for post in posts] == texts
+    assert len({post["id"] for post in posts}) == len(texts)
+    assert post_coalescer.flushes - flushes < len(texts)
+
+    # Строка с несуществующим автором не должна ронять соседей по пакету.
+    good, bad = await asyncio.gather(
+        post_coalescer.insert({"text": "Coalesced neighbour", "author_id": 1}),
+        post_coalescer.insert({"text": "Orphan post", "author_id": -1}),
+        return_exceptions=True,
+    )
+    assert isinstance(bad, IntegrityError)
+    assert not isinstance(good, BaseException)
+    assert good.text == "Coalesced neighbour"
+    await client.delete(f"/api/v1/posts/{good.id}", headers=admin_token)
+
+    await client.request(
+        "DELETE",
+        "/api/v1/posts/batch",
+        json={"ids": [post["id"] for post in posts]},
+        headers=user_token,
+    )
+
+
+@pytest.mark.asyncio
+async def test_post_stats(
+    client: AsyncClient, user_token: dict[str, str], admin_token: dict[str, str]
+):
+    response = await client.get("/api/v1/posts/stats", headers=user_token)
+    assert response.status_code == 200
+    before = response.json()
+
+    response = await client.post(
+        "/api/v1/posts/batch",
+        json=[{"text": f"Stats post {number}"} for number in range(3)],
+        headers=user_token,
+    )
+    post_ids = [post["id"] for post in response.json()]
+    await client.patch(
+        "/api/v1/posts/batch/completed",
+        json=[{"id": post_ids[0], "completed": True}],
+        headers=user_token,
+    )
+    await client.patch(
+        f"/api/v1/posts/{post_ids[1]}/completed",
+        json={"completed": True},
+        headers=user_token,
+    )
+    await client.put(
+        f"/api/v1/posts/{post_ids[1]}", json={"text": "Edited"}, headers=user_token
+    )
+    await client.delete(f"/api/v1/posts/{post_ids[0]}", headers=user_token)
+
+    response = await client.get("/api/v1/posts/stats", headers=user_token)
+    assert response.json() == {
+        "total": before["total"] + 2,
+        "completed": before["completed"] + 1,
+    }
+
+    response = await client.get("/api/v1/admin/username/Aurora", headers=admin_token)
+    user_id = response.json()["id"]
+    response = await client.get(
+        f"/api/v1/admin/id/{user_id}/stats", headers=admin_token
+    )
+    assert response.status_code == 200
+    assert response.json()["total"] == before["total"] + 2
+    response = await client.get("/api/v1/admin/id/999999/stats", headers=admin_token)
+    assert response.status_code == 404
+
+    await client.request(
+        "DELETE", "/api/v1/posts/batch", json={"ids": post_ids[1:]}, headers=user_token
+    )
+    response = await client.get("/api/v1/posts/stats", headers=user_token)
+    assert response.json() == before
+
+
+@pytest.mark.asyncio
+async def test_read_users_posts_filters(
+    client: AsyncClient, user_token: dict[str, str], admin_token: dict[str, str]
+):
+    response = await client.post(
+        "/api/v1/posts/batch",
+        json=[{"text": f"Filtered post {number}"} for number in range(4)],
+        headers=user_token,
+    )
+    posts = response.json()
+    post_ids = [post["id"] for post in posts]
+    await client.patch(
+        "/api/v1/posts/batch/completed",
+        json=[{"id": post_id, "completed": True} for post_id in post_ids[:2]],
+        headers=user_token,
+    )
+    since = posts[0]["created_at"]
+    params = {
+        "completed": "false",
+        "order": "desc",
+        "created_after": "2000-01-01T00:00:00Z",
+    }
+
+    seen = []
+    page_params: dict[str, str | int] = {**params, "limit": 1}
+    while True:
+        response = await client.get(
+            "/api/v1/posts/", params=page_params, headers=user_token
+        )
+        assert response.status_code == 200
+        seen += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        page_params = {**params, "limit": 1, "cursor": cursor}
+    assert not any(post["completed"] for post in seen)
+    keys = [(post["created_at"], post["id"]) for post in seen]
+    assert keys == sorted(keys, reverse=True)
+    ids = {post["id"] for post in seen}
+    assert set(post_ids[2:]) <= ids
+    assert not ids & set(post_ids[:2])
+
+    response = await client.get(
+        "/api/v1/admin/posts",
+        params={"completed": "true", "created_before": since, "limit": 1000},
+        headers=admin_token,
+    )
+    assert response.status_code == 200
+    assert all(post["completed"] for post in response.json())
+    assert not {post["id"] for post in response.json()} & set(post_ids)
+
+    response = await client.get(
+        "/api/v1/posts/", params={"order": "sideways"}, headers=user_token
+    )
+    assert response.status_code == 422
+
+    await client.request(
+        "DELETE", "/api/v1/posts/batch", json={"ids": post_ids}, headers=user_token
+    )
+
+
+@pytest.mark.asyncio
+async def test_coalescer_cancelled_write_fails_waiters():
+    coalescer = InsertCoalescer(window=60, max_items=100)
+    waiter = asyncio.create_task(coalescer.insert({"text": "Lost", "author_id": 1}))
+    await asyncio.sleep(0)
+    coalescer._flush()
+    for task in coalescer._tasks:
+        task.cancel()
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(waiter, 1)
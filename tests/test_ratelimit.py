@@ -0,0 +1,40 @@
+import pytest
+
+from src.core import ratelimit
+from src.core.ratelimit import RateLimiter
+
+
+def test_token_bucket(monkeypatch: pytest.MonkeyPatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "time", lambda: now[0])
+    limiter = RateLimiter(per_minute=60, burst=2, maxsize=10)
+
+    assert limiter.acquire("Luna") == 0
+    assert limiter.acquire("Luna") == 0
+    assert limiter.acquire("Luna") == pytest.approx(1.0)
+    assert limiter.acquire("Aurora") == 0
+    assert limiter.rejected == 1
+
+    now[0] += 0.5
+    assert limiter.acquire("Luna") == pytest.approx(0.5)
+    now[0] += 0.5
+    assert limiter.acquire("Luna") == 0
+
+    # Корзина наполняется не больше чем до burst.
+    now[0] += 60
+    assert limiter.acquire("Luna") == 0
+    assert limiter.acquire("Luna") == 0
+    assert limiter.acquire("Luna") > 0
+
+
+def test_bucket_eviction_and_disable():
+    limiter = RateLimiter(per_minute=1, burst=1, maxsize=2)
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("b") == 0
+    assert limiter.acquire("a") > 0
+    assert limiter.acquire("c") == 0
+    assert len(limiter) == 2
+
+    disabled = RateLimiter(per_minute=0, burst=0, maxsize=2)
+    assert all(disabled.acquire("a") == 0 for _ in range(10))
+    assert len(disabled) == 0
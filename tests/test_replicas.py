@@ -0,0 +1,147 @@
+from typing import Any
+
+import pytest
+from httpx import AsyncClient, Response
+from sqlalchemy import Table, delete, insert, select, text, update
+from sqlmodel import SQLModel
+
+from src.api.deps import principal_cache
+from src.core.config import settings
+from src.core.database import ReplicaRouter, engine, replica_engines
+from src.core.migrations import upgrade_schema
+from src.models import Posts, Users
+
+
+class FakeSession:
+    def __init__(self, name: str, healthy: bool):
+        self.name = name
+        self.healthy = healthy
+        self.info: dict[str, bool] = {}
+        self.closed = False
+
+    async def connection(self) -> None:
+        if not self.healthy:
+            raise OSError("connection refused")
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeMaker:
+    def __init__(self, name: str, healthy: bool = True):
+        self.name = name
+        self.healthy = healthy
+
+    def __call__(self) -> FakeSession:
+        return FakeSession(self.name, self.healthy)
+
+
+def make_router(*replicas: FakeMaker) -> ReplicaRouter:
+    return ReplicaRouter(
+        replicas,  # type: ignore
+        FakeMaker("primary"),  # type: ignore
+        retry_after=60,
+        sticky_seconds=60,
+    )
+
+
+@pytest.mark.asyncio
+async def test_replica_round_robin_and_fallback():
+    first, second = FakeMaker("first"), FakeMaker("second")
+    router = make_router(first, second)
+    names = [(await router.open()).name for _ in range(4)]  # type: ignore
+    assert names == ["first", "second", "first", "second"]
+
+    second.healthy = False
+    names = [(await router.open()).name for _ in range(3)]  # type: ignore
+    assert names == ["first", "first", "first"]
+
+    first.healthy = False
+    session = await router.open()
+    assert session.name == "primary"  # type: ignore
+    assert not session.info.get("replica")
+
+    assert (await make_router().open()).name == "primary"  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_replica_read_your_writes():
+    router = make_router(FakeMaker("replica"))
+    router.mark_write("Bearer writer")
+    writer = await router.open("Bearer writer")
+    assert writer.name == "primary"  # type: ignore
+    reader = await router.open("Bearer reader")
+    assert reader.name == "replica"  # type: ignore
+    assert reader.info["replica"]
+
+
+async def copy_to_replicas(*rows: tuple[Table, dict[str, Any]]) -> None:
+    """Записать строки основной БД в реплики, как будто репликация отстала.
+
+    Рассчитано на отдельные БД вместо настоящих реплик.
+    """
+    for replica in replica_engines:
+        async with replica.begin() as conn:
+            if await conn.scalar(text("SHOW transaction_read_only")) == "on":
+                pytest.skip("replica is read-only, cannot simulate lag")
+            await conn.run_sync(SQLModel.metadata.create_all, checkfirst=True)
+            await upgrade_schema(conn)
+            for table, values in rows:
+                await conn.execute(delete(table).where(table.c.id == values["id"]))
+                await conn.execute(insert(table).values(values))
+
+
+async def delete_from_replicas(user_id: int) -> None:
+    for replica in replica_engines:
+        async with replica.begin() as conn:
+            # Посты удаляются каскадом.
+            await conn.execute(
+                text("DELETE FROM users WHERE id = :id"), {"id": user_id}
+            )
+
+
+@pytest.mark.skipif(not settings.REPLICA_URLS, reason="DB_REPLICA_URLS is not set")
+@pytest.mark.asyncio
+async def test_revoked_token_on_lagging_replica(
+    client: AsyncClient, created_user: Response
+):
+    response = await client.post(
+        "/api/v1/users/login", data={"username": "Luna", "password": "vulpkanin"}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    users, posts = Users.__table__, Posts.__table__  # type: ignore
+    # Пишем в обход API, чтобы не включать чтение из основной БД для токена.
+    async with engine.begin() as conn:
+        user = (
+            await conn.execute(select(users).where(users.c.username == "Luna"))
+        ).one()
+        post = (
+            await conn.execute(
+                insert(posts)
+                .values(text="Primary copy", author_id=user.id, completed=False)
+                .returning(posts)
+            )
+        ).one()
+    await copy_to_replicas(
+        (users, dict(user._mapping)),
+        (posts, {**post._mapping, "text": "Replica copy"}),
+    )
+    try:
+        response = await client.get(f"/api/v1/posts/{post.id}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["text"] == "Replica copy"
+
+        # Выход с другого клиента: реплика еще видит старую версию токена.
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(users)
+                .where(users.c.id == user.id)
+                .values(token_version=users.c.token_version + 1)
+            )
+        principal_cache.invalidate("Luna")
+        response = await client.get(f"/api/v1/posts/{post.id}", headers=headers)
+        assert response.status_code == 403
+    finally:
+        await delete_from_replicas(user.id)
+        async with engine.begin() as conn:
+            await conn.execute(delete(posts).where(posts.c.id == post.id))
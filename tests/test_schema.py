@@ -0,0 +1,82 @@
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from sqlalchemy import text
+
+from src.core.database import async_session
+
+
+def plan_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(sql: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+    async with async_session() as session:
+        # В тестовой БД мало строк, и планировщик выбрал бы seq scan.
+        # Отключаем его, чтобы проверить, что подходящий индекс вообще есть.
+        await session.execute(text("SET LOCAL enable_seqscan = off"))
+        result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params)
+        plan = result.scalar_one()[0]["Plan"]
+    return list(plan_nodes(plan))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "sql, params, index",
+    [
+        (
+            "SELECT * FROM users WHERE username = :username",
+            {"username": "Aurora"},
+            "ix_users_username",
+        ),
+        (
+            "SELECT * FROM posts WHERE author_id = :author_id"
+            " ORDER BY created_at, id LIMIT 10",
+            {"author_id": 2},
+            "ix_posts_author_created_id",
+        ),
+        (
+            "SELECT * FROM posts WHERE author_id = :author_id"
+            " AND (created_at, id) > (now() - interval '1 day', 0)"
+            " ORDER BY created_at, id LIMIT 10",
+            {"author_id": 2},
+            "ix_posts_author_created_id",
+        ),
+        (
+            "SELECT * FROM posts WHERE author_id = :author_id AND NOT completed"
+            " ORDER BY created_at DESC, id DESC LIMIT 10",
+            {"author_id": 2},
+            "ix_posts_author_open",
+        ),
+        (
+            "SELECT * FROM posts ORDER BY created_at, id LIMIT 10",
+            {},
+            "ix_posts_created_id",
+        ),
+        (
+            "SELECT id FROM posts"
+            " WHERE search_vector @@ websearch_to_tsquery('simple', :q)",
+            {"q": "nice post"},
+            "ix_posts_search_vector",
+        ),
+    ],
+)
+async def test_hot_queries_use_indexes(sql: str, params: dict[str, Any], index: str):
+    nodes = await explain(sql, params)
+    assert not any(node["Node Type"] == "Seq Scan" for node in nodes)
+    assert index in {node.get("Index Name") for node in nodes}
+
+
+@pytest.mark.asyncio
+async def test_created_at_is_timestamptz():
+    async with async_session() as session:
+        result = await session.execute(
+            text(
+                "SELECT data_type FROM information_schema.columns"
+                " WHERE table_name = 'posts' AND column_name = 'created_at'"
+            )
+        )
+        assert result.scalar_one() == "timestamp with time zone"
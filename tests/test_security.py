@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from fastapi.exceptions import HTTPException
+
+from src.core import security
+from src.core.config import settings
+from src.core.security import hash_password_async, verify_password_async
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_async():
+    hashed = await hash_password_async("vulpkanin")
+    assert hashed != "vulpkanin"
+    assert await verify_password_async("vulpkanin", hashed)
+    assert not await verify_password_async("wrongPass", hashed)
+
+
+@pytest.mark.asyncio
+async def test_hash_queue_limit(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "HASH_QUEUE_LIMIT", 2)
+    tasks = [asyncio.create_task(hash_password_async("vulpkanin")) for _ in range(3)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == 429
+    assert rejected[0].headers == {"Retry-After": "1"}
+    assert security._pending == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_hashing_leaves_workers_for_logins(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "HASH_WORKERS", 2)
+    security._batch_slots.clear()
+    passwords = ["vulpkanin"] * (security.HASH_BATCH_SIZE * 2)
+    task = asyncio.create_task(security.hash_passwords_async(passwords))
+    await asyncio.sleep(0.05)
+    # Одна задача импорта в пуле и в очереди, второй воркер свободен.
+    assert security._pending == 1
+    assert await verify_password_async(
+        "vulpkanin", await hash_password_async("vulpkanin")
+    )
+    hashes = await task
+    assert len(hashes) == len(passwords)
+    assert security._pending == 0
+
+
+def test_bulk_hashing_in_new_event_loop(monkeypatch: pytest.MonkeyPatch):
+    # Один слот и две задачи: вторая ждет на семафоре в каждом цикле.
+    monkeypatch.setattr(settings, "HASH_WORKERS", 2)
+    monkeypatch.setattr(security, "HASH_BATCH_SIZE", 1)
+    security._batch_slots.clear()
+    for _ in range(2):
+        hashes = asyncio.run(security.hash_passwords_async(["vulpkanin"] * 2))
+        assert len(hashes) == 2
@@ -1,6 +1,9 @@
 import pytest
 from httpx import AsyncClient, Response
 
+from src.api.deps import principal_cache
+from src.core.config import settings
+
 
 @pytest.mark.asyncio
 async def test_register_user(
@@ -141,3 +144,88 @@ async def test_edit_users_info_by_user(
     assert isinstance(data, dict)
     assert "username" in data
     assert "is_active" in data
+
+
+@pytest.mark.asyncio
+async def test_principal_cache(client: AsyncClient, created_user: Response):
+    _ = created_user
+    response = await client.post(
+        "/api/v1/users/login", data={"username": "Luna", "password": "vulpkanin"}
+    )
+    token = response.json()["access_token"]
+    user_token = {"Authorization": f"Bearer {token}"}
+
+    principal_cache.clear()
+    for _ in range(3):
+        response = await client.get("/api/v1/posts/", headers=user_token)
+        assert response.status_code == 200
+    assert principal_cache.misses == 1
+    assert principal_cache.hits == 2
+
+    response = await client.post("/api/v1/users/logout", headers=user_token)
+    assert response.status_code == 204
+    response = await client.get("/api/v1/posts/", headers=user_token)
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_refresh_tokens(client: AsyncClient, created_user: Response):
+    _ = created_user
+    response = await client.post(
+        "/api/v1/users/login", data={"username": "Luna", "password": "vulpkanin"}
+    )
+    assert response.status_code == 200
+    tokens = response.json()
+    access, refresh = tokens["access_token"], tokens["refresh_token"]
+
+    response = await client.get(
+        "/api/v1/posts/", headers={"Authorization": f"Bearer {refresh}"}
+    )
+    assert response.status_code == 401
+    response = await client.post(
+        "/api/v1/users/refresh", json={"refresh_token": access}
+    )
+    assert response.status_code == 401
+
+    response = await client.post(
+        "/api/v1/users/refresh", json={"refresh_token": refresh}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["token_type"] == "bearer"
+    new_token = {"Authorization": f"Bearer {data['access_token']}"}
+    response = await client.get("/api/v1/posts/", headers=new_token)
+    assert response.status_code == 200
+
+    response = await client.post("/api/v1/users/logout", headers=new_token)
+    assert response.status_code == 204
+    for token in (refresh, data["refresh_token"]):
+        response = await client.post(
+            "/api/v1/users/refresh", json={"refresh_token": token}
+        )
+        assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_login_rate_limit(
+    client: AsyncClient, created_user: Response, sql_statements: list[str]
+):
+    _ = created_user
+    for _ in range(settings.LOGIN_RATE_BURST):
+        response = await client.post(
+            "/api/v1/users/login", data={"username": "Luna", "password": "wrongPass"}
+        )
+        assert response.status_code == 401
+
+    sql_statements.clear()
+    response = await client.post(
+        "/api/v1/users/login", data={"username": "Luna", "password": "vulpkanin"}
+    )
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert sql_statements == []
+
+    response = await client.post(
+        "/api/v1/users/login", data={"username": "Aurora", "password": "wrongPass"}
+    )
+    assert response.status_code == 401
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+from src.api import warmup
+from src.api.warmup import Warmup, warm_engine
+from src.core.config import settings
+from src.core.database import make_engine
+from src.core.metrics import pool_metrics
+from src.models import Users
+
+
+async def first_queries(target: AsyncEngine, count: int) -> int:
+    """Число новых соединений на count одновременных первых запросов.
+
+    Запрос тот же, что при авторизации каждого запроса.
+    """
+    make_session = async_sessionmaker(target, class_=AsyncSession)
+
+    async def query() -> None:
+        async with make_session() as session:
+            await session.execute(select(Users).where(Users.username == "admin"))
+
+    connects = pool_metrics.connects
+    await asyncio.gather(*(query() for _ in range(count)))
+    return pool_metrics.connects - connects
+
+
+@pytest.mark.asyncio
+async def test_first_requests_reuse_warm_connections():
+    count = min(settings.DB_WARMUP_CONNECTIONS, settings.DB_POOL_SIZE)
+    # Отдельные движки, чтобы не трогать пул приложения.
+    cold_db = make_engine(settings.DATABASE_URL)
+    warm_db = make_engine(settings.DATABASE_URL)
+    try:
+        assert await first_queries(cold_db, count) == count
+
+        await warm_engine(warm_db, async_sessionmaker(warm_db, class_=AsyncSession))
+        assert await first_queries(warm_db, count) == 0
+    finally:
+        await cold_db.dispose()
+        await warm_db.dispose()
+
+
+@pytest.fixture
+def fresh_warmup(monkeypatch: pytest.MonkeyPatch) -> Warmup:
+    """Свежий прогрев вместо общего, чтобы тесты не зависели от порядка."""
+    fresh = Warmup(retry_seconds=0)
+    monkeypatch.setattr(warmup, "warmup", fresh)
+    return fresh
+
+
+@pytest.mark.asyncio
+async def test_ready_after_warmup(client: AsyncClient, fresh_warmup: Warmup):
+    response = await client.get("/ready")
+    assert response.status_code == 503
+
+    fresh_warmup.start()
+    await fresh_warmup.wait()
+    response = await client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["warmup_seconds"] > 0
+
+
+@pytest.mark.asyncio
+async def test_warmup_retries_unexpected_error(
+    monkeypatch: pytest.MonkeyPatch, fresh_warmup: Warmup
+):
+    calls = 0
+
+    async def flaky_warm_up() -> None:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(warmup, "warm_up", flaky_warm_up)
+    fresh_warmup.start()
+    await fresh_warmup.wait()
+    assert calls == 2
+    assert fresh_warmup.ready
+    assert fresh_warmup.error is None